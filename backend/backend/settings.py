@@ -11,6 +11,7 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+from datetime import timedelta
 from pathlib import Path
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
@@ -44,10 +45,13 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.gis",
+    "django_tasks",
+    "django_tasks.backends.database",
     "core",
 ]
 
 MIDDLEWARE = [
+    "core.timing.TimingMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
@@ -164,4 +168,146 @@ DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 GDAL_LIBRARY_PATH = os.environ.get("GDAL_LIBRARY_PATH")
 GEOS_LIBRARY_PATH = os.environ.get("GEOS_LIBRARY_PATH")
 
-TASKS = {"default": {"BACKEND": "django_tasks.backends.immediate.ImmediateBackend"}}
+TASKS = {
+    "default": {
+        "BACKEND": "django_tasks.backends.database.DatabaseBackend",
+        "QUEUES": ["default", "scraper", "geocode"],
+    }
+}
+
+# Number of worker processes per queue started by `manage.py run_workers`
+TASK_WORKERS = {
+    "default": 1,
+    "scraper": 2,
+    "geocode": 2,
+}
+
+# Failed tasks are retried up to TASK_MAX_ATTEMPTS times, with an exponential backoff starting at TASK_RETRY_DELAY
+TASK_MAX_ATTEMPTS = 3
+TASK_RETRY_DELAY = timedelta(minutes=1)
+
+# Openings whose address wasn't found are geocoded again after RETRY_BASE_DELAY, doubling with every attempt up to
+# RETRY_MAX_DELAY. Cached "not found" results are only reused for RETRY_BASE_DELAY, so the retries reach Photon.
+# New openings are geocoded by the ingest pipeline, the geocode workers only claim them after INGEST_LEASE.
+GEOCODING = {
+    "RETRY_BASE_DELAY": timedelta(hours=1),
+    "RETRY_MAX_DELAY": timedelta(days=30),
+    "INGEST_LEASE": timedelta(minutes=30),
+}
+
+# Per-stage request timings as Server-Timing headers and Prometheus histograms on /metrics, see core/timing.py
+REQUEST_TIMING = {
+    "ENABLED": os.environ.get("REQUEST_TIMING", "").lower() in ("1", "true", "yes"),
+}
+
+# Self-hosted geo services, see core/upstream.py
+# TIMEOUT is the read/write timeout in seconds, isochrones for large travel times can take a few seconds to compute.
+
+UPSTREAM_SERVICES = {
+    "graphhopper": {
+        "BASE_URL": os.environ.get("GRAPHHOPPER_URL", "http://localhost:8989"),
+        "MAX_CONNECTIONS": 20,
+        "MAX_CONCURRENCY": 8,
+        "KEEPALIVE_EXPIRY": 30.0,
+        "CONNECT_TIMEOUT": 2.0,
+        "POOL_TIMEOUT": 10.0,
+        "TIMEOUT": 30.0,
+    },
+    "photon": {
+        "BASE_URL": os.environ.get("PHOTON_URL", "http://localhost:2322"),
+        "MAX_CONNECTIONS": 20,
+        "MAX_CONCURRENCY": 16,
+        "KEEPALIVE_EXPIRY": 30.0,
+        "CONNECT_TIMEOUT": 2.0,
+        "POOL_TIMEOUT": 5.0,
+        "TIMEOUT": 5.0,
+    },
+}
+
+# See core/isochrones.py
+
+ISOCHRONE_CACHE = {
+    "GRID_METERS": 250,
+    "TIME_BUCKET_SECONDS": 60,
+    "TTL": 7 * 24 * 60 * 60,
+    "MEMORY_MAX_BYTES": 64 * 1024 * 1024,
+    "GRAPH_VERSION_CHECK_INTERVAL": 60,
+}
+
+ISOCHRONE_SIMPLIFICATION = {
+    # tolerance for the returned isochrones, as a fraction of a pixel at the requested zoom level
+    "PIXEL_TOLERANCE": 0.5,
+    # max decimals of the returned coordinates, 6 decimals are ~0.1 m
+    "MAX_PRECISION": 6,
+    # tolerance in degrees for the polygon the jobs are filtered with (~10 m)
+    "FILTER_TOLERANCE": 0.0001,
+}
+
+# Scrapers run by `manage.py run_scraper`, with the keyword arguments passed to their constructor
+
+SCRAPERS = {
+    "core.scraper.ostjob_scraper.OstjobScraper": {
+        "page_size": 10,
+        "concurrency": 3,
+        "requests_per_second": 5.0,
+    },
+}
+
+# Scrapers only fetch what changed since their last run, every SCRAPER_FULL_RUN_INTERVAL they fetch everything again
+
+SCRAPER_FULL_RUN_INTERVAL = timedelta(days=7)
+
+# Openings not seen by ARCHIVE_AFTER_FULL_RUNS full runs are archived, see core/archive.py
+ARCHIVE_AFTER_FULL_RUNS = 2
+
+# Near-duplicate detection of openings, see core/dedup.py. With 16 bands of 4 rows, openings with a similarity of 0.5
+# become candidates with a probability of ~64%, ones with 0.8 almost always. THRESHOLD decides which candidates are
+# duplicates. Changing SHINGLE_SIZE, NUM_PERMUTATIONS or BANDS invalidates the stored signatures.
+
+DEDUPLICATION = {
+    "SHINGLE_SIZE": 3,
+    "NUM_PERMUTATIONS": 64,
+    "BANDS": 16,
+    "THRESHOLD": 0.8,
+    # near duplicates also need this title similarity, see core.dedup.title_similarity
+    "TITLE_THRESHOLD": 0.8,
+}
+
+# Travel times from the hubs (core.models.Hub) to every job are precomputed for these profiles, see core/travel_times.py
+
+TRAVEL_TIME_PROFILES = ["car", "bike", "ebike", "fast_ebike"]
+
+# In-memory cache of routes from snapped origins to jobs, see core/travel_times.py
+
+ROUTE_CACHE = {
+    "GRID_METERS": 100,
+    "TTL": 24 * 60 * 60,
+    "MEMORY_MAX_BYTES": 16 * 1024 * 1024,
+}
+
+# Place search (/search), see core/places.py
+
+PLACE_SEARCH = {
+    "LIMIT": 5,
+    # the location bias is rounded to this many decimals (2 decimals are ~1 km), so nearby users share cache entries
+    "BIAS_DECIMALS": 2,
+    "TTL": 24 * 60 * 60,
+    "MEMORY_MAX_BYTES": 16 * 1024 * 1024,
+    # built by `manage.py build_gazetteer`
+    "GAZETTEER_PATH": BASE_DIR / "gazetteer.bin",
+}
+
+# Vector tiles of the job locations (/tiles/{z}/{x}/{y}.pbf)
+
+VECTOR_TILES = {
+    "EXTENT": 4096,
+    "BUFFER": 64,
+    # jobs are clustered below this zoom level, on a grid of CLUSTER_CELLS x CLUSTER_CELLS cells per tile
+    "CLUSTER_MAX_ZOOM": 12,
+    "CLUSTER_CELLS": 32,
+    "MEMORY_MAX_BYTES": 32 * 1024 * 1024,
+    # how often (in seconds) to check whether the jobs changed, which invalidates all cached tiles
+    "VERSION_CHECK_INTERVAL": 30,
+    # Cache-Control max-age of the tile responses
+    "MAX_AGE": 60,
+}
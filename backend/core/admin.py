@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from core.models import JobOpening
+from core.models import Hub, JobOpening
 
 # Register your models here.
 
@@ -9,3 +9,9 @@ from core.models import JobOpening
 class JobOpeningAdmin(admin.ModelAdmin):
     list_filter = ("home_office",)
     ordering = ("title",)
+
+
+@admin.register(Hub)
+class HubAdmin(admin.ModelAdmin):
+    list_display = ("name", "radius_meters", "ready_profiles")
+    ordering = ("name",)
@@ -1,84 +1,353 @@
+import json
+import math
 from collections import defaultdict
+from typing import Literal
 
-from asgiref.sync import sync_to_async
-from async_lru import alru_cache
-from django.contrib.gis.geos import Polygon
-from django.http import HttpRequest
-from ninja import NinjaAPI
-import httpx
-from .models import JobOpening
-from .schemas import DistanceCalculation, PlacesSearchResult, IsochroneOut, JobOpeningOut
+from django.conf import settings
+from django.contrib.gis.geos import MultiPolygon
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import Case, F, IntegerField, OuterRef, Q, QuerySet, Subquery, Value, When
+from django.http import Http404, HttpRequest, HttpResponse, StreamingHttpResponse
+from django.shortcuts import aget_object_or_404
+from ninja import Query
+from ninja.errors import HttpError
 
-api = NinjaAPI()
+from .geometry import encode_polyline, polygon_rings, simplify_for_filter, zoom_precision
+from .isochrones import (
+    isochrone_bands,
+    isochrone_to_multipolygon,
+    retrieve_isochrone,
+    retrieve_isochrone_bands,
+    snap_to_grid,
+)
+from .models import HubTravelTime, JobOpening
+from .places import search_places
+from .schemas import (
+    DistanceCalculation,
+    EncodedIsochroneOut,
+    PlacesSearchResult,
+    IsochroneBandsOut,
+    IsochroneOut,
+    JobFilters,
+    JobOpeningOut,
+    JobOpeningListOut,
+    JobOpeningPage,
+    TravelDistance,
+    TravelDistancesIn,
+)
+from .tiles import is_valid_tile, render_tile
+from .timing import TimedNinjaAPI, TimedRouter, timed
+from .travel_times import find_hub, jobs_reachable_from_hub, travel_routes
+
+# every view, its serialisation and the stages timed below end up in the request timings, see core/timing.py
+api = TimedNinjaAPI(default_router=TimedRouter())
+
+# every band adds polygons to the response and a condition to the /jobs query
+MAX_ISOCHRONE_BANDS = 24
 
 
 @api.post("/jobs/calc_distance", response=float)
 async def calc_distance(request: HttpRequest, params: DistanceCalculation):
-    job = await sync_to_async(JobOpening.objects.get)(pk=params.job_id)
-    async with httpx.AsyncClient() as client:
-        request_params = {
-            "profile": params.profile,
-            "points": [
-                [params.abfahrtsort.lon, params.abfahrtsort.lat],
-                job.location.coords,
-            ],
-            "instructions": False,
-            "calc_points": False,
-            "details": [
-                "time",
-            ],
+    routes = await travel_routes(
+        lat=params.abfahrtsort.lat, lon=params.abfahrtsort.lon, profile=params.profile, job_ids=[params.job_id]
+    )
+    if params.job_id not in routes:
+        raise Http404("No geocoded job found with this id")
+    route = routes[params.job_id]
+    return round(route.distance_meters / 1000, 1) if route else 0
+
+
+@api.post("/jobs/travel_distances", response=list[TravelDistance])
+async def travel_distances(request: HttpRequest, params: TravelDistancesIn):
+    """Distance and travel time from the origin to each of the given jobs, jobs that aren't geocoded are left out."""
+    routes = await travel_routes(
+        lat=params.abfahrtsort.lat, lon=params.abfahrtsort.lon, profile=params.profile, job_ids=params.job_ids
+    )
+    return [
+        {
+            "job_id": job_id,
+            "distance_km": round(route.distance_meters / 1000, 1) if route else None,
+            "travel_time_minutes": round(route.time_seconds / 60) if route else None,
         }
-        resp = await client.post("http://localhost:8989/route", json=request_params, timeout=30000)
-        resp.raise_for_status()
-        data = resp.json()
-    distance = data.get("paths", [{"distance": 0}])[0]["distance"]
-    return round(distance / 1000, 1)
+        for job_id, route in routes.items()
+    ]
+
+
+def band_count(travel_time_minutes: int, band_minutes: int) -> int:
+    """Number of bands needed to cover the travel time, the last band ends at the next multiple of `band_minutes`."""
+    bands = math.ceil(travel_time_minutes / band_minutes)
+    if bands > MAX_ISOCHRONE_BANDS:
+        raise HttpError(400, f"At most {MAX_ISOCHRONE_BANDS} bands are supported, use a larger band_minutes")
+    return bands
+
+
+def tag_bands(queryset: QuerySet[JobOpening], conditions: list[tuple[int, Q]]) -> QuerySet[JobOpening]:
+    """Annotates every job with the travel time of the first (innermost) band whose condition it matches."""
+    whens = [When(condition, then=Value(minutes)) for minutes, condition in conditions]
+    return queryset.annotate(band=Case(*whens, output_field=IntegerField()))
+
+
+async def jobs_in_reach(
+    *, travel_time_minutes: int, lat: float, lon: float, profile: str, band_minutes: int | None = None
+) -> QuerySet[JobOpening]:
+    """
+    The jobs reachable within the travel time. With `band_minutes`, every job is tagged with its band (see
+    `JobOpeningOut.band`), so the client can filter for shorter travel times itself.
+    """
+    bands = band_count(travel_time_minutes, band_minutes) if band_minutes else None
+    travel_time_seconds = bands * band_minutes * 60 if bands else travel_time_minutes * 60
+
+    # near a hub the travel times are precomputed, no need to ask GraphHopper for an isochrone
+    if hub := await find_hub(lat=lat, lon=lon, profile=profile):
+        queryset = jobs_reachable_from_hub(hub, profile, travel_time_seconds)
+        if bands:
+            travel_seconds = HubTravelTime.objects.filter(hub=hub, profile=profile, job=OuterRef("pk"))
+            queryset = queryset.annotate(hub_travel_seconds=Subquery(travel_seconds.values("travel_seconds")[:1]))
+            limits = [i * band_minutes for i in range(1, bands + 1)]
+            conditions = [(minutes, Q(hub_travel_seconds__lte=minutes * 60)) for minutes in limits]
+            queryset = tag_bands(queryset, conditions)
+        return queryset
+
+    if bands:
+        with timed("isochrone"):
+            isochrone = await retrieve_isochrone_bands(
+                band_seconds=band_minutes * 60, bands=bands, lat=lat, lon=lon, profile=profile
+            )
+        with timed("polygon"):
+            areas = [simplify_for_filter(band) for band in isochrone_bands(isochrone)]
+        # the outermost band contains all the others
+        area = areas[-1] if areas else MultiPolygon(srid=4326)
+    else:
+        with timed("isochrone"):
+            isochrone = await retrieve_isochrone(
+                travel_time_seconds=travel_time_seconds, lat=lat, lon=lon, profile=profile
+            )
+        with timed("polygon"):
+            area = simplify_for_filter(isochrone_to_multipolygon(isochrone))
+
+    # ST_Intersects is index-assisted, PostGIS prefilters on the bounding box (&&) using the partial GIST index on the
+    # locations of the active openings
+    queryset = JobOpening.objects.active().filter(location__isnull=False, location__intersects=area)
+    if bands:
+        conditions = [((i + 1) * band_minutes, Q(location__intersects=band)) for i, band in enumerate(areas)]
+        queryset = tag_bands(queryset, conditions)
+    return queryset
+
+
+def search_jobs(queryset: QuerySet[JobOpening], q: str) -> QuerySet[JobOpening]:
+    """
+    Filters the jobs by a web search style query (``"quoted phrases"``, ``or``, ``-excluded``) in German or French and
+    annotates their `rank`. The query is answered by the GIN index on `search_vector`, together with the GIST index on
+    `location` if the jobs are filtered by an isochrone.
+    """
+    query = SearchQuery(q, config="german", search_type="websearch") | SearchQuery(
+        q, config="french", search_type="websearch"
+    )
+    return queryset.filter(search_vector=query).annotate(rank=SearchRank(F("search_vector"), query))
 
 
 @api.get("/jobs", response=list[JobOpeningOut])
-async def jobs(request: HttpRequest, travel_time_minutes: int, lat: float, lon: float, profile: str):
-    travel_time_seconds = travel_time_minutes * 60
-    isochrone = await retrieve_isochrone(travel_time_seconds=travel_time_seconds, lat=lat, lon=lon, profile=profile)
+async def jobs(
+    request: HttpRequest,
+    travel_time_minutes: int,
+    lat: float,
+    lon: float,
+    profile: str,
+    band_minutes: int | None = Query(None, ge=1),
+    q: str | None = None,
+    filters: JobFilters = Query(...),
+):
+    """With `q`, only the jobs matching the search query are returned, the best matches first."""
+    queryset = await jobs_in_reach(
+        travel_time_minutes=travel_time_minutes, lat=lat, lon=lon, profile=profile, band_minutes=band_minutes
+    )
+    queryset = filters.filter(queryset)
+    if q:
+        queryset = search_jobs(queryset, q).order_by("-rank")
+    return [job async for job in queryset.only(*JobOpeningOut.Meta.fields)]
+
+
+@api.get("/jobs/page", response=JobOpeningPage)
+async def jobs_page(
+    request: HttpRequest,
+    travel_time_minutes: int,
+    lat: float,
+    lon: float,
+    profile: str,
+    cursor: int | None = None,
+    limit: int = Query(500, ge=1, le=5000),
+    band_minutes: int | None = Query(None, ge=1),
+    q: str | None = None,
+    filters: JobFilters = Query(...),
+):
+    queryset = await jobs_in_reach(
+        travel_time_minutes=travel_time_minutes, lat=lat, lon=lon, profile=profile, band_minutes=band_minutes
+    )
+    queryset = filters.filter(queryset)
+    # pages are ordered by id for the cursor, not by rank
+    if q:
+        queryset = search_jobs(queryset, q)
+    if cursor is not None:
+        queryset = queryset.filter(id__gt=cursor)
+
+    # one more than requested, so we know whether there is a next page
+    items = [job async for job in queryset.only(*JobOpeningListOut.Meta.fields).order_by("id")[: limit + 1]]
+    next_cursor = items[limit - 1].id if len(items) > limit else None
+    return {"items": items[:limit], "next_cursor": next_cursor}
+
 
-    polygons = isochrone.get("polygons", [])
-    all_polygons = []
-    for p in polygons:
-        rings = p.get("geometry", {}).get("coordinates", [])
+@api.get("/jobs/stream")
+async def jobs_stream(
+    request: HttpRequest,
+    travel_time_minutes: int,
+    lat: float,
+    lon: float,
+    profile: str,
+    format: Literal["ndjson", "geojson"] = "ndjson",
+    band_minutes: int | None = Query(None, ge=1),
+    q: str | None = None,
+    filters: JobFilters = Query(...),
+):
+    """
+    Streams the jobs in reach as they are read from a server-side cursor, either as newline delimited JSON
+    (one `JobOpeningListOut` per line) or as a GeoJSON FeatureCollection. With `q`, the best matches come first.
+    """
+    queryset = await jobs_in_reach(
+        travel_time_minutes=travel_time_minutes, lat=lat, lon=lon, profile=profile, band_minutes=band_minutes
+    )
+    queryset = filters.filter(queryset)
+    if q:
+        queryset = search_jobs(queryset, q).order_by("-rank")
+    rows = queryset.only(*JobOpeningListOut.Meta.fields).aiterator(chunk_size=500)
+
+    async def ndjson():
+        async for job in rows:
+            yield json.dumps(JobOpeningListOut.from_orm(job).model_dump()) + "\n"
+
+    async def geojson():
+        yield '{"type":"FeatureCollection","features":['
+        separator = ""
+        async for job in rows:
+            properties = JobOpeningListOut.from_orm(job).model_dump(exclude={"location"})
+            feature = {"type": "Feature", "geometry": {"type": "Point", "coordinates": job.location.coords}}
+            yield separator + json.dumps({**feature, "properties": properties})
+            separator = ","
+        yield "]}"
+
+    if format == "geojson":
+        return StreamingHttpResponse(geojson(), content_type="application/geo+json")
+    return StreamingHttpResponse(ndjson(), content_type="application/x-ndjson")
+
+
+@api.get("/tiles/{z}/{x}/{y}.pbf")
+async def job_tiles(
+    request: HttpRequest,
+    z: int,
+    x: int,
+    y: int,
+    travel_time_minutes: int | None = None,
+    lat: float | None = None,
+    lon: float | None = None,
+    profile: str | None = None,
+):
+    """
+    Vector tile (MVT) of the job locations, in the layer "jobs". Jobs are clustered at low zoom levels, see
+    `core.tiles`. With `travel_time_minutes`, `lat`, `lon` and `profile`, only the jobs in reach are included.
+    """
+    if not is_valid_tile(z, x, y):
+        raise Http404("No such tile")
+
+    isochrone_filter = (travel_time_minutes, lat, lon, profile)
+    if any(value is not None for value in isochrone_filter):
+        if any(value is None for value in isochrone_filter):
+            raise HttpError(400, "travel_time_minutes, lat, lon and profile are required to filter by isochrone")
+
+        def get_jobs():
+            return jobs_in_reach(travel_time_minutes=travel_time_minutes, lat=lat, lon=lon, profile=profile)
+
+        # the isochrone is computed for the snapped origin anyway, so nearby origins share their tiles
+        snapped = snap_to_grid(lat, lon, settings.ISOCHRONE_CACHE["GRID_METERS"])
+        tile = await render_tile(z, x, y, get_jobs, filter_key=(travel_time_minutes, *snapped, profile))
+    else:
+        tile = await render_tile(z, x, y)
 
-        all_polygons.append(Polygon(*rings))
+    response = HttpResponse(tile, content_type="application/vnd.mapbox-vector-tile")
+    response["Cache-Control"] = f"public, max-age={settings.VECTOR_TILES['MAX_AGE']}"
+    return response
 
-    def load_jobs_sync():
-        return list(JobOpening.objects.filter(location__isnull=False, location__within=all_polygons).all())
 
-    return await sync_to_async(load_jobs_sync, thread_sensitive=True)()
+@api.get("/jobs/{job_id}", response=JobOpeningOut)
+async def job_detail(request: HttpRequest, job_id: int):
+    return await aget_object_or_404(JobOpening.objects.only(*JobOpeningOut.Meta.fields), pk=job_id)
 
 
 @api.get("/generate_isochrone", response=IsochroneOut)
-async def generate_isochrone(request: HttpRequest, travel_time_minutes: int, lat: float, lon: float, profile: str):
+async def generate_isochrone(
+    request: HttpRequest,
+    travel_time_minutes: int,
+    lat: float,
+    lon: float,
+    profile: str,
+    zoom: int | None = Query(None, ge=0, le=22),
+):
+    """With `zoom` the isochrone is simplified to what is visible at that zoom level, otherwise it is in full detail."""
     travel_time_seconds = travel_time_minutes * 60
-    resp = await retrieve_isochrone(travel_time_seconds=travel_time_seconds, lat=lat, lon=lon, profile=profile)
-    polygons = resp.get("polygons", [])
-    results = []
-    for p in polygons:
-        rings = p.get("geometry", {}).get("coordinates", [])
-
-        results.append({"rings": rings})
-    return {"polygons": results}
-
-
-@alru_cache(maxsize=32)
-async def retrieve_isochrone(*, travel_time_seconds: int, lat: float, lon: float, profile: str) -> dict:
-    async with httpx.AsyncClient() as client:
-        params = {
-            "point": f"{lat},{lon}",
-            "key": "",
-            "profile": profile,
-            "time_limit": travel_time_seconds,
+    with timed("isochrone"):
+        resp = await retrieve_isochrone(travel_time_seconds=travel_time_seconds, lat=lat, lon=lon, profile=profile)
+    with timed("polygon"):
+        polygons = polygon_rings(isochrone_to_multipolygon(resp), zoom)
+    return {"polygons": [{"rings": rings} for rings in polygons]}
+
+
+@api.get("/generate_isochrone/encoded", response=EncodedIsochroneOut)
+async def generate_isochrone_encoded(
+    request: HttpRequest,
+    travel_time_minutes: int,
+    lat: float,
+    lon: float,
+    profile: str,
+    zoom: int | None = Query(None, ge=0, le=22),
+):
+    """Like /generate_isochrone, with every ring as encoded polyline."""
+    travel_time_seconds = travel_time_minutes * 60
+    with timed("isochrone"):
+        resp = await retrieve_isochrone(travel_time_seconds=travel_time_seconds, lat=lat, lon=lon, profile=profile)
+    precision = zoom_precision(zoom)
+    with timed("polygon"):
+        polygons = polygon_rings(isochrone_to_multipolygon(resp), zoom)
+        encoded = [{"rings": [encode_polyline(ring, precision) for ring in rings]} for rings in polygons]
+    return {"precision": precision, "polygons": encoded}
+
+
+@api.get("/generate_isochrone_bands", response=IsochroneBandsOut)
+async def generate_isochrone_bands(
+    request: HttpRequest,
+    travel_time_minutes: int,
+    lat: float,
+    lon: float,
+    profile: str,
+    band_minutes: int = Query(5, ge=1),
+    zoom: int | None = Query(None, ge=0, le=22),
+):
+    """
+    The nested isochrones for every `band_minutes` step up to `travel_time_minutes`, computed with one upstream request.
+    Together with `/jobs?band_minutes=...` a travel time slider can be moved without any further requests.
+    """
+    bands = band_count(travel_time_minutes, band_minutes)
+    with timed("isochrone"):
+        isochrone = await retrieve_isochrone_bands(
+            band_seconds=band_minutes * 60, bands=bands, lat=lat, lon=lon, profile=profile
+        )
+    with timed("polygon"):
+        return {
+            "bands": [
+                {
+                    "travel_time_minutes": (i + 1) * band_minutes,
+                    "polygons": [{"rings": rings} for rings in polygon_rings(band, zoom)],
+                }
+                for i, band in enumerate(isochrone_bands(isochrone))
+            ]
         }
-        resp = await client.get("http://localhost:8989/isochrone", params=params, timeout=30000)
-        resp.raise_for_status()
-        data = resp.json()
-    return data
 
 
 def process_features_for_ambiguity(features: list[dict]) -> list[dict]:
@@ -126,26 +395,5 @@ def process_features_for_ambiguity(features: list[dict]) -> list[dict]:
 
 @api.get("/search", response=list[PlacesSearchResult])
 async def search(request: HttpRequest, query: str, zoom: int, lat: float, lon: float):
-    raw_places = await retrieve_places(query=query, zoom=zoom, lat=lat, lon=lon)
+    raw_places = await search_places(query=query, zoom=zoom, lat=lat, lon=lon)
     return process_features_for_ambiguity(raw_places)
-
-
-@alru_cache(maxsize=32)
-async def retrieve_places(*, query: str, lat: float, lon: float, zoom: int) -> list:
-    async with httpx.AsyncClient() as client:
-        resp = await client.get(
-            "http://localhost:2322/api",
-            params={
-                "q": query,
-                "limit": 5,
-                "lat": lat,
-                "lon": lon,
-                "location_bias_scale": 0.2,
-                "zoom": zoom,
-                "layer": ["city", "locality"],
-            },
-            timeout=30000,
-        )
-
-    data = resp.raise_for_status().json()
-    return data.get("features", [])
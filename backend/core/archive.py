@@ -0,0 +1,44 @@
+"""
+Archiving of stale job openings.
+
+Openings are never deleted. The ones the scrapers didn't see for ``ARCHIVE_AFTER_FULL_RUNS`` full runs are archived
+(`JobOpening.archived_at` is set). /jobs, the tiles, geocoding and the travel times only look at the active openings
+(`JobOpeningQuerySet.active`), through partial indexes that don't grow with the archive. Archived openings stay in the
+table for historical queries (`JobOpeningQuerySet.archived`). An archived opening that is scraped again becomes active
+again, see core/ingest.py.
+
+Only full runs see every listed opening, so the cutoff is derived from them: an opening is stale if it wasn't seen in
+the ``ARCHIVE_AFTER_FULL_RUNS`` full run intervals before the latest full run of the scraper that ran one the longest
+ago. If a scraper stops running, the cutoff stops moving and nothing more is archived.
+"""
+
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Max
+from django.utils import timezone
+
+from .models import JobOpening, ScraperState
+
+
+async def stale_cutoff() -> datetime | None:
+    """Active openings last seen before the cutoff are stale. None if not every scraper completed a full run yet."""
+    # a state per scraper and query set, the query set changes whenever the queries are edited. The states of old query
+    # sets are never run again, so only the latest full run of every scraper counts
+    latest_runs = (
+        ScraperState.objects.filter(scraper__in=settings.SCRAPERS)
+        .values("scraper")
+        .annotate(latest=Max("last_full_run_at"))
+    )
+    latest = {run["scraper"]: run["latest"] async for run in latest_runs}
+    if any(latest.get(scraper) is None for scraper in settings.SCRAPERS):
+        return None
+    return min(latest.values()) - settings.ARCHIVE_AFTER_FULL_RUNS * settings.SCRAPER_FULL_RUN_INTERVAL
+
+
+async def archive_stale_openings() -> int:
+    """Archives the stale openings, returns how many."""
+    cutoff = await stale_cutoff()
+    if cutoff is None:
+        return 0
+    return await JobOpening.objects.active().filter(last_seen_at__lt=cutoff).aupdate(archived_at=timezone.now())
@@ -0,0 +1,80 @@
+import asyncio
+import time
+from collections import OrderedDict
+from collections.abc import Awaitable, Callable
+from typing import Any, Hashable
+
+from .timing import record_cache_lookup
+
+
+class LRUCache:
+    """
+    In-process LRU cache that is bounded by the total size of its values instead of the number of entries.
+
+    The size of an entry has to be given by the caller (usually the length of the upstream response body), entries
+    older than `ttl` seconds are treated as missing. Lookups in a cache with a `name` are recorded in the request
+    timings, see core/timing.py.
+    """
+
+    def __init__(self, max_bytes: int, ttl: float | None = None, name: str | None = None):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.name = name
+        self.current_bytes = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, int, float]] = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return self.get(key) is not None
+
+    def get(self, key: Hashable, default=None):
+        entry = self._entries.get(key)
+        if entry is not None and self.ttl is not None and time.monotonic() - entry[2] > self.ttl:
+            self._remove(key)
+            entry = None
+        if self.name is not None:
+            record_cache_lookup(self.name, entry is not None)
+        if entry is None:
+            return default
+        self._entries.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: Hashable, value, size: int):
+        if key in self._entries:
+            self._remove(key)
+        if size > self.max_bytes:
+            return
+        self._entries[key] = (value, size, time.monotonic())
+        self.current_bytes += size
+        while self.current_bytes > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def clear(self):
+        self._entries.clear()
+        self.current_bytes = 0
+
+    def _remove(self, key: Hashable):
+        _, size, _ = self._entries.pop(key)
+        self.current_bytes -= size
+
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls with the same key: while a call is in flight, callers with the same key wait for its
+    result instead of starting their own.
+    """
+
+    def __init__(self):
+        self._in_flight: dict[Hashable, asyncio.Future] = {}
+
+    async def run(self, key: Hashable, fetch: Callable[[], Awaitable]):
+        future = self._in_flight.get(key)
+        if future is None:
+            future = asyncio.ensure_future(fetch())
+            self._in_flight[key] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        # a cancelled caller must not cancel the call the others are waiting for
+        return await asyncio.shield(future)
@@ -0,0 +1,97 @@
+"""
+Fingerprints and near-duplicate detection for job openings.
+
+The fingerprint identifies the content of an opening, independent of the platform it was scraped from: a hash of the
+normalised title, company and place (zip and city) and of the normalised description. Openings with equal fingerprints
+are the same job. The place is part of it because chains post the same job for several branches, which are different
+openings.
+
+Reposts with small changes and postings of the same job on several platforms have different fingerprints, they are
+found with MinHash: the signature of an opening estimates the Jaccard similarity of its word shingles with any other
+opening's. For lookups, the signature is split into ``BANDS`` bands (locality sensitive hashing), whose hashes are
+stored in an array column with a GIN index. Openings sharing a band hash and the place are candidates, the signatures
+decide, together with the titles: postings written from the same template (e.g. "Java Developer" and "Python
+Developer" of one company) have similar signatures, but are different jobs.
+"""
+
+import hashlib
+import random
+import re
+import unicodedata
+
+from django.conf import settings
+
+# Mersenne prime, larger than any shingle hash, so the permutations (a * x + b) mod p are distinct
+PRIME = (1 << 61) - 1
+
+_rng = random.Random(20240601)  # fixed seed, the signatures are stored and must stay comparable
+PERMUTATIONS = [
+    (_rng.randrange(1, PRIME), _rng.randrange(0, PRIME)) for _ in range(settings.DEDUPLICATION["NUM_PERMUTATIONS"])
+]
+
+
+def normalize_text(text: str) -> str:
+    """Lower case, without accents, punctuation and repeated whitespace."""
+    text = "".join(c for c in unicodedata.normalize("NFKD", text.casefold()) if not unicodedata.combining(c))
+    return " ".join(re.findall(r"\w+", text))
+
+
+def _hash(*parts: str, digest_size: int = 16) -> bytes:
+    return hashlib.blake2b("\x1f".join(parts).encode(), digest_size=digest_size).digest()
+
+
+def place_key(zip: str, city: str) -> str:
+    return normalize_text(f"{zip} {city}")
+
+
+def fingerprint(title: str, company_name: str, description: str, zip: str, city: str) -> str:
+    description_hash = _hash(normalize_text(description)).hex()
+    return _hash(normalize_text(title), normalize_text(company_name), place_key(zip, city), description_hash).hex()
+
+
+def shingles(text: str) -> set[str]:
+    words = normalize_text(text).split()
+    size = settings.DEDUPLICATION["SHINGLE_SIZE"]
+    if len(words) <= size:
+        return {" ".join(words)}
+    return {" ".join(words[i : i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text: str) -> list[int]:
+    """The MinHash signature of the word shingles of the text."""
+    hashes = [int.from_bytes(_hash(shingle, digest_size=8)) % PRIME for shingle in shingles(text)]
+    return [min((a * h + b) % PRIME for h in hashes) for a, b in PERMUTATIONS]
+
+
+def band_hashes(signature: list[int]) -> list[int]:
+    """One hash per band of the signature, as signed 64 bit integers, so they fit a bigint column."""
+    bands = settings.DEDUPLICATION["BANDS"]
+    rows = len(signature) // bands
+    return [
+        int.from_bytes(
+            _hash(str(band), *map(str, signature[band * rows : (band + 1) * rows]), digest_size=8), signed=True
+        )
+        for band in range(bands)
+    ]
+
+
+def similarity(a: list[int], b: list[int]) -> float:
+    """Estimated Jaccard similarity of the shingles behind two signatures."""
+    if not a or len(a) != len(b):
+        return 0.0
+    return sum(x == y for x, y in zip(a, b)) / len(a)
+
+
+def title_similarity(a: str, b: str) -> float:
+    """
+    The share of the words of the shorter normalised title that are also in the other one, e.g. 1.0 for "Software
+    Engineer" and "Software Engineer (m/w/d)", 0.5 for "Java Developer" and "Python Developer".
+    """
+    a_words, b_words = set(normalize_text(a).split()), set(normalize_text(b).split())
+    if not a_words or not b_words:
+        return 0.0
+    return len(a_words & b_words) / min(len(a_words), len(b_words))
+
+
+def opening_text(row: dict) -> str:
+    return " ".join([row["company_name"], row["title"], row["description"]])
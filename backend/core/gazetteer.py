@@ -0,0 +1,181 @@
+"""
+Memory-mapped gazetteer of the Swiss municipalities and localities, for place search without Photon.
+
+The file is built from the `Place` table by ``manage.py build_gazetteer`` and consists of
+
+- a header: magic, number of keys, offset of the records
+- the key index: one entry per key, sorted by key, with the offsets of the key and the record as well as the kind and
+  location of the place, so the matches can be ranked without reading their records
+- the keys (length prefixed, UTF-8) and the records (name, canton, lon, lat)
+
+Keys are folded names (`fold`): lower case, without accents, so "zurich" finds Zürich. Names with umlauts get a second
+key with the umlauts spelled out ("zuerich"). A prefix search is a binary search over the key index, reading only the
+few keys it compares from the mapped file, followed by a scan over the matching range. All worker processes share the
+file through the page cache.
+"""
+
+import bisect
+import math
+import mmap
+import os
+import re
+import struct
+import unicodedata
+from collections.abc import Iterable
+from pathlib import Path
+
+from .models import Place
+
+MAGIC = b"GAZ1"
+HEADER = struct.Struct("<4sII")
+INDEX_ENTRY = struct.Struct("<IIBff")
+KEY_LENGTH = struct.Struct("<H")
+RECORD_COORDINATES = struct.Struct("<dd")
+
+KINDS = [Place.Kind.MUNICIPALITY, Place.Kind.LOCALITY]
+MUNICIPALITY = KINDS.index(Place.Kind.MUNICIPALITY)
+
+UMLAUTS = str.maketrans({"ä": "ae", "ö": "oe", "ü": "ue"})
+
+# a prefix matching more keys than this (e.g. a single letter) isn't answered, ranking them all would take too long
+MAX_CANDIDATES = 300
+
+
+def _strip_accents(text: str) -> str:
+    return "".join(c for c in unicodedata.normalize("NFKD", text) if not unicodedata.combining(c))
+
+
+def normalize(text: str) -> str:
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def fold(text: str) -> str:
+    """Lower case, without accents and with collapsed whitespace, the form queries are looked up in."""
+    return _strip_accents(normalize(text))
+
+
+def keys_of(name: str) -> set[str]:
+    name = normalize(name)
+    return {_strip_accents(name), _strip_accents(name.translate(UMLAUTS))}
+
+
+def _encode_string(text: str) -> bytes:
+    data = text.encode()
+    return KEY_LENGTH.pack(len(data)) + data
+
+
+def build(places: Iterable[Place], path: Path):
+    """Writes the gazetteer of the given places, replacing an existing file atomically."""
+    records = bytearray()
+    keys = []
+    for place in places:
+        record_offset = len(records)
+        records += _encode_string(place.name) + _encode_string(place.state)
+        records += RECORD_COORDINATES.pack(place.location.x, place.location.y)
+        entry = (record_offset, KINDS.index(place.kind), place.location.x, place.location.y)
+        keys += [(key.encode(), entry) for key in keys_of(place.name)]
+    keys.sort()
+
+    index_size = len(keys) * INDEX_ENTRY.size
+    key_data = bytearray()
+    index = bytearray()
+    for key, entry in keys:
+        index += INDEX_ENTRY.pack(HEADER.size + index_size + len(key_data), *entry)
+        key_data += KEY_LENGTH.pack(len(key)) + key
+    records_offset = HEADER.size + index_size + len(key_data)
+
+    tmp_path = path.with_suffix(".tmp")
+    with open(tmp_path, "wb") as f:
+        f.write(HEADER.pack(MAGIC, len(keys), records_offset))
+        f.write(index)
+        f.write(key_data)
+        f.write(records)
+    os.replace(tmp_path, path)
+    return len(keys)
+
+
+class _Keys:
+    """The sorted keys of a mapped gazetteer as a read-only sequence, for bisect."""
+
+    def __init__(self, gazetteer: "Gazetteer"):
+        self.gazetteer = gazetteer
+
+    def __len__(self):
+        return self.gazetteer.key_count
+
+    def __getitem__(self, i: int) -> bytes:
+        return self.gazetteer.key(i)
+
+
+class Gazetteer:
+    def __init__(self, path: Path):
+        with open(path, "rb") as f:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.key_count, self._records_offset = HEADER.unpack_from(self._data)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not a gazetteer")
+        self._keys = _Keys(self)
+
+    def close(self):
+        self._data.close()
+
+    def _read_string(self, offset: int) -> tuple[bytes, int]:
+        (length,) = KEY_LENGTH.unpack_from(self._data, offset)
+        start = offset + KEY_LENGTH.size
+        return self._data[start : start + length], start + length
+
+    def entry(self, i: int) -> tuple[int, int, int, float, float]:
+        return INDEX_ENTRY.unpack_from(self._data, HEADER.size + i * INDEX_ENTRY.size)
+
+    def key(self, i: int) -> bytes:
+        return self._read_string(self.entry(i)[0])[0]
+
+    def record(self, record_offset: int, kind: int) -> dict:
+        """The place as Photon feature."""
+        name, offset = self._read_string(self._records_offset + record_offset)
+        state, offset = self._read_string(offset)
+        lon, lat = RECORD_COORDINATES.unpack_from(self._data, offset)
+        return {
+            "type": "Feature",
+            "geometry": {"type": "Point", "coordinates": [lon, lat]},
+            "properties": {
+                "name": name.decode(),
+                "state": state.decode(),
+                "countrycode": "CH",
+                "type": "city" if kind == MUNICIPALITY else "locality",
+            },
+        }
+
+    def search(self, query: str, *, limit: int, lat: float, lon: float) -> list[dict] | None:
+        """
+        The places with a name starting with the query, exact matches first, then municipalities before localities and
+        nearer places before farther ones. None if more than ``MAX_CANDIDATES`` keys start with the query.
+        """
+        prefix = fold(query).encode()
+        if not prefix:
+            return []
+        start = bisect.bisect_left(self._keys, prefix)
+        end = bisect.bisect_left(self._keys, prefix + b"\xff", lo=start)
+        if end - start > MAX_CANDIDATES:
+            return None
+
+        # the shortest keys come first, so exact matches are at the start of the range
+        exact = set()
+        for i in range(start, end):
+            if self.key(i) != prefix:
+                break
+            exact.add(self.entry(i)[1])
+
+        # squared equirectangular distance, good enough for ranking within Switzerland
+        lon_scale = math.cos(math.radians(lat))
+        candidates = {}
+        for i in range(start, end):
+            _, record_offset, kind, place_lon, place_lat = self.entry(i)
+            candidates[record_offset] = (
+                record_offset not in exact,
+                kind != MUNICIPALITY,
+                (place_lat - lat) ** 2 + ((place_lon - lon) * lon_scale) ** 2,
+                kind,
+            )
+        best = sorted(candidates.items(), key=lambda item: item[1])[:limit]
+        return [self.record(record_offset, rank[-1]) for record_offset, rank in best]
@@ -0,0 +1,211 @@
+"""
+Batched, concurrent geocoding of job openings with Photon.
+
+A `GeocodingWorker` claims a batch of openings due for geocoding (``SELECT ... FOR UPDATE SKIP LOCKED``), geocodes the
+distinct addresses of the batch concurrently over the pooled Photon client and writes the results back with one bulk
+update. Several workers can run in parallel, each in its own thread with its own DB connection and event loop.
+
+Results are cached in `GeocodedAddress` by normalised address, most openings come from a few hundred repeat employers
+so most lookups never reach Photon.
+
+New openings are also geocoded right after they were scraped, as a stage of the ingest pipeline (`geocode_openings`),
+the workers pick up whatever that stage missed. Both route the openings they located from the hubs right away, see
+core/travel_times.py.
+
+Every opening tracks its `JobOpening.geocode_status`, the number of attempts and when it is due next. Openings whose
+address wasn't found keep an empty location and are retried with an exponential backoff, so the spatial index (partial,
+on the openings with a location) and the queries on it never see them.
+"""
+
+import asyncio
+import threading
+import time
+import traceback
+from collections.abc import Iterable
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import upstream
+from .models import GeocodedAddress, JobOpening
+from .travel_times import route_from_hubs
+
+Address = tuple[str, ...]
+
+GEOCODE_FIELDS = ["location", "geocode_status", "geocode_attempts", "geocode_attempted_at", "geocode_due_at"]
+
+
+@dataclass(frozen=True)
+class GeocodeResult:
+    location: Point | None
+    confidence: float  # share of the address parts that were part of the successful query, 0 if nothing was found
+
+
+def make_address(*parts: str) -> Address:
+    """Normalises the parts of an address (case, whitespace) and drops empty ones."""
+    return tuple(normalized for p in parts if (normalized := " ".join(p.casefold().split())))
+
+
+def address_of(opening: JobOpening) -> Address:
+    return make_address(opening.company_name, opening.address, opening.zip, opening.city)
+
+
+def cache_key(address: Address) -> str:
+    return "|".join(address)
+
+
+def cached_results(addresses: Iterable[Address]) -> dict[Address, GeocodeResult]:
+    """
+    Returns the cached results for the given addresses. Addresses that were never looked up are missing, as are those
+    that weren't found more than ``RETRY_BASE_DELAY`` ago.
+    """
+    keys = {cache_key(a): a for a in addresses}
+    stale = Q(location__isnull=True, updated_at__lt=timezone.now() - settings.GEOCODING["RETRY_BASE_DELAY"])
+    return {
+        keys[entry.query]: GeocodeResult(entry.location, entry.confidence)
+        for entry in GeocodedAddress.objects.filter(query__in=keys).exclude(stale)
+    }
+
+
+def store_results(results: dict[Address, GeocodeResult]):
+    GeocodedAddress.objects.bulk_create(
+        [
+            GeocodedAddress(query=cache_key(address), location=result.location, confidence=result.confidence)
+            for address, result in results.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["query"],
+        update_fields=["location", "confidence", "updated_at"],
+    )
+
+
+async def geocode_address(address: Address) -> GeocodeResult:
+    """Looks up the address, dropping the most specific part (starting with the company name) until Photon finds it."""
+    parts = list(address)
+    while parts:
+        resp = await upstream.photon.get("/api/", params={"q": ", ".join(parts)})
+        features = resp.json()["features"]
+        if features:
+            geom = features[0]["geometry"]
+            return GeocodeResult(Point(*geom["coordinates"], srid=4326), len(parts) / len(address))
+        parts = parts[1:]
+    return GeocodeResult(None, 0)
+
+
+async def geocode_addresses(addresses: Iterable[Address], concurrency: int) -> dict[Address, GeocodeResult]:
+    """Geocodes every distinct address once, with at most `concurrency` lookups in flight."""
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def lookup(address: Address):
+        async with semaphore:
+            return address, await geocode_address(address)
+
+    return dict(await asyncio.gather(*map(lookup, set(addresses))))
+
+
+def retry_delay(attempts: int) -> timedelta:
+    """The delay before the next attempt, after `attempts` attempts that found nothing."""
+    base, maximum = settings.GEOCODING["RETRY_BASE_DELAY"], settings.GEOCODING["RETRY_MAX_DELAY"]
+    return min(base * 2 ** (attempts - 1), maximum)
+
+
+def due_openings(now: datetime):
+    return JobOpening.objects.active().filter(geocode_due_at__lte=now)
+
+
+def apply_results(openings: list[JobOpening], results: dict[Address, GeocodeResult]) -> int:
+    """Sets the location and geocode status of the openings, returns how many weren't found."""
+    now = timezone.now()
+    not_found = 0
+    for opening in openings:
+        opening.location = results[address_of(opening)].location
+        opening.geocode_attempts += 1
+        opening.geocode_attempted_at = now
+        if opening.location is not None:
+            opening.geocode_status = JobOpening.GeocodeStatus.FOUND
+            opening.geocode_due_at = None
+        else:
+            opening.geocode_status = JobOpening.GeocodeStatus.NOT_FOUND
+            opening.geocode_due_at = now + retry_delay(opening.geocode_attempts)
+            not_found += 1
+    return not_found
+
+
+async def geocode_openings(openings: list[JobOpening], concurrency: int) -> int:
+    """Geocodes the given openings and saves their locations, returns how many weren't found."""
+    addresses = set(map(address_of, openings))
+    results = await sync_to_async(cached_results)(addresses)
+    looked_up = await geocode_addresses(addresses - results.keys(), concurrency)
+    await sync_to_async(store_results)(looked_up)
+    not_found = apply_results(openings, results | looked_up)
+    await JobOpening.objects.abulk_update(openings, GEOCODE_FIELDS)
+    return not_found
+
+
+class Progress:
+    def __init__(self):
+        self.started = time.monotonic()
+        self.geocoded = 0
+        self.not_found = 0
+        self._lock = threading.Lock()
+
+    def add(self, geocoded: int, not_found: int):
+        with self._lock:
+            self.geocoded += geocoded
+            self.not_found += not_found
+            total = self.geocoded + self.not_found
+            rate = total / (time.monotonic() - self.started)
+        print(f"{total} openings processed ({self.not_found} not found), {rate:.1f} openings/s")
+
+
+class GeocodingWorker:
+    def __init__(self, *, batch_size: int, concurrency: int, progress: Progress):
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.progress = progress
+
+    def claim_batch(self) -> list[JobOpening]:
+        queryset = (
+            due_openings(timezone.now())
+            .only("id", "company_name", "address", "zip", "city", *GEOCODE_FIELDS)
+            .order_by("geocode_due_at")
+        )
+        return list(queryset.select_for_update(skip_locked=True)[: self.batch_size])
+
+    def run(self):
+        try:
+            # one event loop for the lifetime of the worker, so its pooled Photon connections are reused across batches.
+            # The client belongs to this loop, closing it doesn't affect the other workers
+            with asyncio.Runner() as runner:
+                while self.process_batch(runner):
+                    pass
+                runner.run(upstream.close_clients())
+        finally:
+            connection.close()
+
+    def process_batch(self, runner: asyncio.Runner) -> bool:
+        with transaction.atomic():
+            batch = self.claim_batch()
+            if not batch:
+                return False
+
+            addresses = set(map(address_of, batch))
+            results = cached_results(addresses)
+            looked_up = runner.run(geocode_addresses(addresses - results.keys(), self.concurrency))
+            store_results(looked_up)
+            not_found = apply_results(batch, results | looked_up)
+            JobOpening.objects.bulk_update(batch, GEOCODE_FIELDS)
+
+        try:
+            runner.run(route_from_hubs(batch))
+        except Exception:
+            # left to precompute_travel_times_task
+            traceback.print_exc()
+        self.progress.add(len(batch) - not_found, not_found)
+        return True
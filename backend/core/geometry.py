@@ -0,0 +1,97 @@
+"""
+Simplification and compact encoding of isochrone geometries.
+
+GraphHopper isochrones of long car trips have tens of thousands of vertices, far more than can be seen on the map. For
+the response they are simplified (topology preserving, so rings don't cross or collapse) with a tolerance derived from
+the zoom level and the coordinates are rounded to the precision the zoom level needs. Rounding also makes consecutive
+vertices collapse, which are dropped.
+
+`encode_polyline` implements Google's encoded polyline algorithm, which is a lot smaller than nested JSON lists.
+
+The polygon used to filter the jobs is simplified separately, with ``FILTER_TOLERANCE``: fewer vertices make the
+``ST_Intersects`` test cheaper, but it must stay accurate at the street level, independent of the map zoom.
+"""
+
+import math
+
+from django.conf import settings
+from django.contrib.gis.geos import MultiPolygon, Polygon
+
+TILE_SIZE = 256
+
+Ring = list[list[float]]
+
+
+def degrees_per_pixel(zoom: int) -> float:
+    """Width of a pixel in degrees of longitude at the given web map zoom level."""
+    return 360 / (TILE_SIZE * 2**zoom)
+
+
+def zoom_tolerance(zoom: int) -> float:
+    return settings.ISOCHRONE_SIMPLIFICATION["PIXEL_TOLERANCE"] * degrees_per_pixel(zoom)
+
+
+def zoom_precision(zoom: int | None) -> int:
+    """Number of decimals needed so that rounding moves a vertex by less than a pixel."""
+    max_precision = settings.ISOCHRONE_SIMPLIFICATION["MAX_PRECISION"]
+    if zoom is None:
+        return max_precision
+    return min(max_precision, max(0, math.ceil(-math.log10(degrees_per_pixel(zoom)))))
+
+
+def simplify(geometry: MultiPolygon, tolerance: float) -> MultiPolygon:
+    if tolerance <= 0 or geometry.empty:
+        return geometry
+    simplified = geometry.simplify(tolerance, preserve_topology=True)
+    # GEOS returns a Polygon if only one polygon is left
+    if isinstance(simplified, Polygon):
+        simplified = MultiPolygon(simplified, srid=geometry.srid)
+    return simplified
+
+
+def simplify_for_filter(geometry: MultiPolygon) -> MultiPolygon:
+    return simplify(geometry, settings.ISOCHRONE_SIMPLIFICATION["FILTER_TOLERANCE"])
+
+
+def quantize(ring, precision: int) -> Ring:
+    """Rounds the coordinates of a ring and drops vertices that became duplicates of their predecessor."""
+    quantized = []
+    for x, y in ring:
+        vertex = [round(x, precision), round(y, precision)]
+        if not quantized or vertex != quantized[-1]:
+            quantized.append(vertex)
+    return quantized
+
+
+def polygon_rings(geometry: MultiPolygon, zoom: int | None) -> list[list[Ring]]:
+    """
+    The rings of every polygon, simplified and quantized for the zoom level. Without a zoom level the geometry is
+    returned in full resolution.
+    """
+    if zoom is not None:
+        geometry = simplify(geometry, zoom_tolerance(zoom))
+    precision = zoom_precision(zoom)
+    return [[quantize(ring, precision) for ring in polygon.coords] for polygon in geometry]
+
+
+def _encode_value(value: int) -> str:
+    value = ~(value << 1) if value < 0 else value << 1
+    chunks = []
+    while value >= 0x20:
+        chunks.append(chr((0x20 | (value & 0x1F)) + 63))
+        value >>= 5
+    chunks.append(chr(value + 63))
+    return "".join(chunks)
+
+
+def encode_polyline(ring: Ring, precision: int = 5) -> str:
+    """Encodes a ring as encoded polyline, in (lat, lon) order like Google's original format."""
+    factor = 10**precision
+    encoded = []
+    previous_lat = previous_lon = 0
+    for lon, lat in ring:
+        lat, lon = round(lat * factor), round(lon * factor)
+        encoded.append(_encode_value(lat - previous_lat))
+        encoded.append(_encode_value(lon - previous_lon))
+        previous_lat, previous_lon = lat, lon
+    return "".join(encoded)
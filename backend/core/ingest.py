@@ -0,0 +1,309 @@
+"""
+Batched ingest of scraped job openings.
+
+Scrapers normalise their items into `JobOpening` field values (see `BaseScraper.normalize`), which are then written
+with one ``INSERT ... ON CONFLICT (company_name, title, zip) DO UPDATE`` per batch instead of a get/save roundtrip per
+job. ``last_seen_at`` is an ``auto_now`` field and therefore refreshed by the same statement.
+
+New openings get their location right away: from the geocode cache, or from Photon in a separate stage of the pipeline,
+which runs while the next pages are fetched and written. Until that stage is done with them (or
+``GEOCODING["INGEST_LEASE"]`` has passed), they aren't due for the geocode workers.
+
+`ingest_scraper` runs this as a pipeline: pages are persisted as they arrive, while the scraper keeps fetching. The
+queue between the two stages is bounded, so a slow database throttles the scraper instead of filling up memory.
+
+Openings whose content didn't change (same ``content_hash`` of their raw data) aren't written again, only their
+``last_seen_at`` is bumped with one bulk update per page, which keeps WAL and vacuum work down. The same happens for
+duplicates of existing openings under another unique key: exact ones (same fingerprint) and near ones (MinHash, see
+core/dedup.py), e.g. the same job scraped from another platform. They collapse into the opening seen first, which
+also holds for near duplicates within one page.
+
+A `ScraperState` tracks the most recent publication date seen, which scrapers use to stop paging once they reach known
+items.
+"""
+
+import asyncio
+import hashlib
+import json
+import traceback
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import datetime
+from itertools import batched
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .dedup import band_hashes, fingerprint, minhash, opening_text, place_key, similarity, title_similarity
+from .geocoding import cached_results, geocode_openings, make_address
+from .models import JobOpening, ScraperState
+from .scraper import BaseScraper
+from .travel_times import route_from_hubs
+
+UNIQUE_FIELDS = ["company_name", "title", "zip"]
+
+UPDATE_FIELDS = [
+    "description",
+    "city",
+    "address",
+    "country",
+    "raw_data",
+    "first_published_at",
+    "url_application",
+    "url_description",
+    "last_seen_at",
+    "fingerprint",
+    "content_hash",
+    "minhash",
+    "minhash_bands",
+    "archived_at",  # None for scraped rows, so archived openings that show up again are reactivated
+]
+
+
+def deduplicate(rows: list[dict]) -> list[dict]:
+    """
+    Removes rows with the same unique key, the last one wins.
+
+    Postgres refuses to update the same row twice in one ``ON CONFLICT DO UPDATE`` statement.
+    """
+    unique_rows = {tuple(row[f] for f in UNIQUE_FIELDS): row for row in rows}
+    return list(unique_rows.values())
+
+
+async def apply_cached_locations(rows: list[dict]):
+    """
+    Sets the location of every row without one whose address is found in the geocode cache, with one query for all
+    rows.
+    """
+    rows = [row for row in rows if row.get("location") is None]
+    addresses = [make_address(row["company_name"], row["address"], row["zip"], row["city"]) for row in rows]
+    results = await sync_to_async(cached_results)(addresses)
+    for row, address in zip(rows, addresses):
+        result = results.get(address)
+        if result is not None and result.location is not None:
+            row["location"] = result.location
+
+
+async def upsert_openings(rows: list[dict], batch_size: int = 500) -> list[JobOpening]:
+    """Inserts or updates the given normalised rows, returns the written openings (with their primary keys set)."""
+    rows = deduplicate(rows)
+    await apply_cached_locations(rows)
+    # new openings only, the geocode fields aren't among the UPDATE_FIELDS
+    lease_until = timezone.now() + settings.GEOCODING["INGEST_LEASE"]
+    for row in rows:
+        if row.get("location") is not None:
+            row |= {"geocode_status": JobOpening.GeocodeStatus.FOUND, "geocode_due_at": None}
+        else:
+            row["geocode_due_at"] = lease_until
+
+    openings = []
+    for batch in batched(rows, batch_size):
+        openings += await JobOpening.objects.abulk_create(
+            [JobOpening(**row) for row in batch],
+            update_conflicts=True,
+            unique_fields=UNIQUE_FIELDS,
+            update_fields=UPDATE_FIELDS,
+        )
+    return openings
+
+
+def unique_key(row: dict) -> str:
+    return "|".join(row[f] for f in UNIQUE_FIELDS)
+
+
+def opening_key(opening: JobOpening) -> str:
+    return "|".join(getattr(opening, f) for f in UNIQUE_FIELDS)
+
+
+def content_hash(row: dict) -> str:
+    return hashlib.blake2b(json.dumps(row["raw_data"], sort_keys=True).encode(), digest_size=16).hexdigest()
+
+
+def published_at(row: dict) -> datetime | None:
+    value = row.get("first_published_at")
+    if isinstance(value, str):
+        value = parse_datetime(value)
+    if value is not None and timezone.is_naive(value):
+        value = timezone.make_aware(value)
+    return value
+
+
+def is_full_run_due(state: ScraperState) -> bool:
+    if state.last_full_run_at is None or state.watermark is None:
+        return True
+    return timezone.now() - state.last_full_run_at > settings.SCRAPER_FULL_RUN_INTERVAL
+
+
+@dataclass
+class IngestStats:
+    scraped: int = 0
+    written: int = 0
+    unchanged: int = 0
+    duplicates: int = 0
+    geocoded: int = 0
+
+
+async def find_known_openings(rows: list[dict]) -> list[JobOpening]:
+    """The existing openings with the unique key or the fingerprint of any of the rows."""
+    condition = Q(fingerprint__in=[row["fingerprint"] for row in rows])
+    for row in rows:
+        condition |= Q(**{f: row[f] for f in UNIQUE_FIELDS})
+    fields = ["id", "fingerprint", "content_hash", *UNIQUE_FIELDS]
+    return [opening async for opening in JobOpening.objects.filter(condition).only(*fields)]
+
+
+def near_duplicate_similarity(row: dict, other_minhash: list[int], other_title: str) -> float:
+    """The MinHash similarity of the row to another opening at the same place, 0 if their titles are too different."""
+    if title_similarity(row["title"], other_title) < settings.DEDUPLICATION["TITLE_THRESHOLD"]:
+        return 0.0
+    return similarity(row["minhash"], other_minhash)
+
+
+async def find_near_duplicates(rows: list[dict]) -> dict[str, int]:
+    """
+    The id of the most similar existing opening at the same place (zip and city) for every row that has one above
+    ``THRESHOLD``, by unique key. The rows need their MinHash signatures.
+    """
+    bands = list({band for row in rows for band in row["minhash_bands"]})
+    if not bands:
+        return {}
+    candidates = JobOpening.objects.filter(minhash_bands__overlap=bands).only("id", "minhash", "city", *UNIQUE_FIELDS)
+    by_place = defaultdict(list)
+    async for candidate in candidates:
+        by_place[place_key(candidate.zip, candidate.city)].append(candidate)
+
+    duplicates = {}
+    for row in rows:
+        best, best_similarity = None, settings.DEDUPLICATION["THRESHOLD"]
+        for candidate in by_place[place_key(row["zip"], row["city"])]:
+            if (value := near_duplicate_similarity(row, candidate.minhash, candidate.title)) >= best_similarity:
+                best, best_similarity = candidate, value
+        if best is not None:
+            duplicates[unique_key(row)] = best.id
+    return duplicates
+
+
+def collapse_near_duplicates(rows: list[dict]) -> list[dict]:
+    """
+    The rows without those that are near duplicates of an earlier one at the same place. `find_near_duplicates` only
+    compares with stored openings, so this catches the copies of a job within one batch.
+    """
+    kept, by_place = [], defaultdict(list)
+    for row in rows:
+        same_place = by_place[place_key(row["zip"], row["city"])]
+        if all(
+            near_duplicate_similarity(row, other["minhash"], other["title"]) < settings.DEDUPLICATION["THRESHOLD"]
+            for other in same_place
+        ):
+            same_place.append(row)
+            kept.append(row)
+    return kept
+
+
+async def ingest_rows(rows: list[dict], state: ScraperState | None, stats: IngestStats) -> list[JobOpening]:
+    """Writes the rows, returns the newly inserted openings."""
+    rows = deduplicate(rows)
+    if not rows:
+        return []
+    for row in rows:
+        row["fingerprint"] = fingerprint(row["title"], row["company_name"], row["description"], row["zip"], row["city"])
+        row["content_hash"] = content_hash(row)
+
+    known = await find_known_openings(rows)
+    by_key = {opening_key(opening): opening for opening in known}
+    by_fingerprint = {opening.fingerprint: opening for opening in known}
+
+    changed, new, unchanged_ids, duplicate_ids = [], [], [], []
+    for row in rows:
+        if (existing := by_key.get(unique_key(row))) is not None:
+            if existing.content_hash == row["content_hash"]:
+                unchanged_ids.append(existing.id)
+            else:
+                changed.append(row)
+        elif (duplicate := by_fingerprint.get(row["fingerprint"])) is not None:
+            duplicate_ids.append(duplicate.id)
+        else:
+            new.append(row)
+
+    for row in changed + new:
+        row["minhash"] = minhash(opening_text(row))
+        row["minhash_bands"] = band_hashes(row["minhash"])
+    near_duplicates = await find_near_duplicates(new)
+    duplicate_ids += near_duplicates.values()
+    new = [row for row in new if unique_key(row) not in near_duplicates]
+    unique_new = collapse_near_duplicates(new)
+
+    openings = await upsert_openings(changed + unique_new)
+    if seen_ids := unchanged_ids + duplicate_ids:
+        await JobOpening.objects.filter(id__in=seen_ids).aupdate(last_seen_at=timezone.now(), archived_at=None)
+    stats.written += len(openings)
+    stats.unchanged += len(unchanged_ids)
+    stats.duplicates += len(duplicate_ids) + len(new) - len(unique_new)
+
+    if state is not None:
+        for row in rows:
+            if (value := published_at(row)) and (state.watermark is None or value > state.watermark):
+                state.watermark = value
+    return openings[len(changed) :]
+
+
+async def geocode_stage(queue: asyncio.Queue[list[JobOpening] | None], stats: IngestStats, concurrency: int):
+    """
+    Geocodes the new openings put on the queue until it gets None, and routes those with a location from the hubs.
+    Failures are left to the geocode workers and to `precompute_travel_times_task`.
+    """
+    while (openings := await queue.get()) is not None:
+        if without_location := [opening for opening in openings if opening.location is None]:
+            try:
+                not_found = await geocode_openings(without_location, concurrency)
+            except Exception:
+                traceback.print_exc()
+                # hand them over to the geocode workers without waiting for the lease to run out
+                ids = [opening.id for opening in without_location]
+                await JobOpening.objects.filter(id__in=ids).aupdate(geocode_due_at=timezone.now())
+            else:
+                stats.geocoded += len(without_location) - not_found
+        try:
+            await route_from_hubs(openings)
+        except Exception:
+            traceback.print_exc()
+
+
+async def ingest_scraper(
+    scraper: BaseScraper, state: ScraperState | None = None, queue_size: int = 4, geocode_concurrency: int = 8
+) -> IngestStats:
+    stats = IngestStats()
+    # pages, followed by None when the scraper is done or by the exception it failed with
+    queue: asyncio.Queue[list[dict] | Exception | None] = asyncio.Queue(maxsize=queue_size)
+    # new openings, geocoded and routed from the hubs while the next pages are fetched and written
+    geocode_queue: asyncio.Queue[list[JobOpening] | None] = asyncio.Queue(maxsize=queue_size)
+
+    async def fetch():
+        try:
+            async for page in scraper.pages():
+                await queue.put(page)
+        except Exception as e:
+            await queue.put(e)
+        else:
+            await queue.put(None)
+
+    fetcher = asyncio.create_task(fetch())
+    geocoder = asyncio.create_task(geocode_stage(geocode_queue, stats, geocode_concurrency))
+    try:
+        while (page := await queue.get()) is not None:
+            if isinstance(page, Exception):
+                raise page
+            rows = [row for row in map(scraper.normalize, page) if row is not None]
+            stats.scraped += len(page)
+            new_openings = await ingest_rows(rows, state, stats)
+            if new_openings:
+                await geocode_queue.put(new_openings)
+        await geocode_queue.put(None)
+        await geocoder
+    finally:
+        fetcher.cancel()
+        geocoder.cancel()
+    return stats
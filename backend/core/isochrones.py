@@ -0,0 +1,172 @@
+"""
+Two-tier cache for GraphHopper isochrones.
+
+Isochrones are the slowest thing we compute, so they are cached in memory (per process, bounded by size) and in the
+database (shared between all workers and kept across restarts).
+
+To get a useful hit rate the request is normalised before it is sent upstream: the origin is snapped to a grid of
+``GRID_METERS`` and the travel time is rounded to ``TIME_BUCKET_SECONDS``. Every key also contains the import date of
+the GraphHopper graph, so rebuilding the graph invalidates all cached isochrones.
+
+Banded isochrones (`retrieve_isochrone_bands`) are fetched with GraphHopper's ``buckets`` parameter, which returns the
+nested isochrones for every ``band_seconds`` step up to the maximum from a single request. They are cached like any
+other isochrone, the number of bands is part of the key.
+"""
+
+import json
+import math
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from datetime import timedelta
+
+from django.conf import settings
+from django.contrib.gis.geos import MultiPolygon, Polygon
+from django.utils import timezone
+
+from . import upstream
+from .cache import LRUCache
+from .models import CachedIsochrone
+from .timing import record_cache_lookup
+
+METERS_PER_DEGREE = 111_320
+
+
+@dataclass(frozen=True)
+class IsochroneKey:
+    lat: float
+    lon: float
+    profile: str
+    travel_time_seconds: int
+    graph_version: str
+    buckets: int = 1
+
+    def __str__(self):
+        key = f"{self.profile}:{self.lat:.6f}:{self.lon:.6f}:{self.travel_time_seconds}:{self.graph_version}"
+        return key if self.buckets == 1 else f"{key}:{self.buckets}"
+
+
+def snap_to_grid(lat: float, lon: float, grid_meters: float) -> tuple[float, float]:
+    """Snaps a coordinate to the center of its grid cell, cells are roughly `grid_meters` wide in both directions."""
+    if grid_meters <= 0:
+        return lat, lon
+    lat_step = grid_meters / METERS_PER_DEGREE
+    snapped_lat = (math.floor(lat / lat_step) + 0.5) * lat_step
+    lon_step = grid_meters / (METERS_PER_DEGREE * math.cos(math.radians(snapped_lat)))
+    snapped_lon = (math.floor(lon / lon_step) + 0.5) * lon_step
+    return round(snapped_lat, 6), round(snapped_lon, 6)
+
+
+def bucket_travel_time(travel_time_seconds: int, bucket_seconds: int) -> int:
+    if bucket_seconds <= 1:
+        return travel_time_seconds
+    return max(bucket_seconds, round(travel_time_seconds / bucket_seconds) * bucket_seconds)
+
+
+_memory_cache = LRUCache(
+    max_bytes=settings.ISOCHRONE_CACHE["MEMORY_MAX_BYTES"], ttl=settings.ISOCHRONE_CACHE["TTL"], name="isochrone"
+)
+_graph_version: tuple[str, float] | None = None
+
+
+async def get_graph_version() -> str:
+    """Returns the import date of the GraphHopper graph, refreshed every ``GRAPH_VERSION_CHECK_INTERVAL`` seconds."""
+    global _graph_version
+
+    now = time.monotonic()
+    if _graph_version is None or now - _graph_version[1] > settings.ISOCHRONE_CACHE["GRAPH_VERSION_CHECK_INTERVAL"]:
+        resp = await upstream.graphhopper.get("/info")
+        version = resp.json().get("import_date", "")
+        if _graph_version is not None and _graph_version[0] != version:
+            # the graph was rebuilt, nothing we cached so far is valid anymore
+            _memory_cache.clear()
+            await CachedIsochrone.objects.exclude(graph_version=version).adelete()
+        _graph_version = (version, now)
+    return _graph_version[0]
+
+
+async def make_key(*, travel_time_seconds: int, lat: float, lon: float, profile: str, buckets: int = 1) -> IsochroneKey:
+    cache_settings = settings.ISOCHRONE_CACHE
+    lat, lon = snap_to_grid(lat, lon, cache_settings["GRID_METERS"])
+    # with buckets, the time of every single bucket is rounded, so the band boundaries stay on the same steps
+    bucket_seconds = bucket_travel_time(travel_time_seconds // buckets, cache_settings["TIME_BUCKET_SECONDS"])
+    return IsochroneKey(
+        lat=lat,
+        lon=lon,
+        profile=profile,
+        travel_time_seconds=bucket_seconds * buckets,
+        graph_version=await get_graph_version(),
+        buckets=buckets,
+    )
+
+
+async def retrieve_isochrone(
+    *, travel_time_seconds: int, lat: float, lon: float, profile: str, buckets: int = 1
+) -> dict:
+    key = await make_key(travel_time_seconds=travel_time_seconds, lat=lat, lon=lon, profile=profile, buckets=buckets)
+    cache_key = str(key)
+
+    data = _memory_cache.get(cache_key)
+    if data is not None:
+        return data
+
+    min_computed_at = timezone.now() - timedelta(seconds=settings.ISOCHRONE_CACHE["TTL"])
+    cached = await CachedIsochrone.objects.filter(key=cache_key, computed_at__gte=min_computed_at).afirst()
+    record_cache_lookup("isochrone_db", cached is not None)
+    if cached is not None:
+        _memory_cache.set(cache_key, cached.data, size=len(json.dumps(cached.data)))
+        return cached.data
+
+    params = {
+        "point": f"{key.lat},{key.lon}",
+        "key": "",
+        "profile": key.profile,
+        "time_limit": key.travel_time_seconds,
+        "buckets": key.buckets,
+    }
+    resp = await upstream.graphhopper.get("/isochrone", params=params)
+    data = resp.json()
+
+    _memory_cache.set(cache_key, data, size=len(resp.content))
+    await CachedIsochrone.objects.aupdate_or_create(
+        key=cache_key,
+        defaults={
+            "profile": key.profile,
+            "travel_time_seconds": key.travel_time_seconds,
+            "graph_version": key.graph_version,
+            "data": data,
+        },
+    )
+    return data
+
+
+def isochrone_to_multipolygon(isochrone: dict) -> MultiPolygon:
+    """Merges the polygons of a GraphHopper isochrone response into one geometry, so it is sent to the DB only once."""
+    polygons = []
+    for p in isochrone.get("polygons", []):
+        rings = p.get("geometry", {}).get("coordinates", [])
+        if rings:
+            polygons.append(Polygon(*rings))
+    return MultiPolygon(*polygons, srid=4326)
+
+
+async def retrieve_isochrone_bands(*, band_seconds: int, bands: int, lat: float, lon: float, profile: str) -> dict:
+    """The isochrones for ``band_seconds``, ``2 * band_seconds``, ... up to ``bands * band_seconds``, in one request."""
+    return await retrieve_isochrone(
+        travel_time_seconds=band_seconds * bands, lat=lat, lon=lon, profile=profile, buckets=bands
+    )
+
+
+def isochrone_bands(isochrone: dict) -> list[MultiPolygon]:
+    """
+    Splits a banded GraphHopper isochrone response into one geometry per band, innermost first.
+
+    The bands are nested, every band contains all the bands inside of it.
+    """
+    polygons = defaultdict(list)
+    for p in isochrone.get("polygons", []):
+        rings = p.get("geometry", {}).get("coordinates", [])
+        if rings:
+            polygons[p.get("properties", {}).get("bucket", 0)].append(Polygon(*rings))
+    buckets = max(polygons, default=-1) + 1
+    return [MultiPolygon(*polygons[bucket], srid=4326) for bucket in range(buckets)]
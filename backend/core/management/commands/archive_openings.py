@@ -0,0 +1,11 @@
+import djclick as click
+from asgiref.sync import async_to_sync
+
+from core.archive import archive_stale_openings
+
+
+@click.command()
+def command():
+    """Archives the openings the scrapers didn't see for a while, see core/archive.py."""
+    archived = async_to_sync(archive_stale_openings)()
+    print(f"Archived {archived} stale openings.")
@@ -0,0 +1,84 @@
+import statistics
+import time
+
+import djclick as click
+from django.contrib.gis.geos import MultiPolygon, Point
+from django.db import connection, transaction
+
+from core.models import JobOpening
+from core.schemas import JobOpeningOut
+
+# roughly the bounding box of Switzerland
+BBOX = (5.96, 45.82, 10.49, 47.81)
+
+
+class Rollback(Exception):
+    pass
+
+
+def seed(rows: int):
+    """
+    Inserts `rows` synthetic openings with random locations, all of them are rolled back after the benchmark. Django
+    doesn't keep column defaults in the DB, so every NOT NULL column needs a value here.
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            INSERT INTO core_jobopening (company_name, title, description, location, zip, city, address, country,
+                                         phone, url_application, url_description, first_seen_at, last_seen_at,
+                                         raw_data, fingerprint, content_hash, minhash, minhash_bands,
+                                         geocode_status, geocode_attempts, geocode_attempted_at, geocode_due_at)
+            SELECT 'bench company ' || (i % 500), 'bench opening ' || i, repeat('lorem ipsum ', 200),
+                   ST_SetSRID(ST_MakePoint(%s + random() * %s, %s + random() * %s), 4326),
+                   '', '', '', '', '', '', '', now(), now(), '{}'::jsonb, '', '', '{}', '{}',
+                   'found', 1, now(), NULL
+            FROM generate_series(1, %s) AS i
+            """,
+            [BBOX[0], BBOX[2] - BBOX[0], BBOX[1], BBOX[3] - BBOX[1], rows],
+        )
+        cursor.execute("ANALYZE core_jobopening")
+
+
+@click.command()
+@click.option("--rows", "-r", multiple=True, type=int, default=[10_000, 100_000, 1_000_000], show_default=True)
+@click.option("--repeat", default=20, show_default=True, help="Number of timed runs per table size.")
+@click.option("--lat", default=47.4997, show_default=True)
+@click.option("--lon", default=8.7241, show_default=True)
+@click.option("--radius", default=0.2, show_default=True, help="Radius of the test area in degrees.")
+def command(rows, repeat, lat, lon, radius):
+    """
+    Benchmarks the spatial query of /jobs against synthetic data.
+
+    For every table size the query plan (EXPLAIN ANALYZE) and the latency of loading the rows are printed. The seeded
+    rows are inserted in a transaction that is rolled back at the end, existing data isn't touched.
+    """
+    area = MultiPolygon(Point(lon, lat, srid=4326).buffer(radius), srid=4326)
+    queryset = (
+        JobOpening.objects.active()
+        .filter(location__isnull=False, location__intersects=area)
+        .only(*JobOpeningOut.Meta.fields)
+    )
+
+    for row_count in sorted(rows):
+        try:
+            with transaction.atomic():
+                print(f"\n=== {row_count} rows ===")
+                started = time.perf_counter()
+                seed(row_count)
+                print(f"seeded in {time.perf_counter() - started:.1f}s")
+
+                print(queryset.explain(analyze=True, buffers=True))
+
+                timings = []
+                for _ in range(repeat):
+                    started = time.perf_counter()
+                    found = len(list(queryset))
+                    timings.append((time.perf_counter() - started) * 1000)
+                print(
+                    f"{found} rows matched, "
+                    f"median: {statistics.median(timings):.1f}ms, "
+                    f"min: {min(timings):.1f}ms, max: {max(timings):.1f}ms"
+                )
+                raise Rollback
+        except Rollback:
+            pass
@@ -0,0 +1,13 @@
+import djclick as click
+from django.conf import settings
+
+from core import gazetteer
+from core.models import Place
+
+
+@click.command()
+def command():
+    """Builds the place search gazetteer from the places loaded with `load_places`, running servers pick it up."""
+    path = settings.PLACE_SEARCH["GAZETTEER_PATH"]
+    keys = gazetteer.build(Place.objects.order_by("id").iterator(), path)
+    print(f"Wrote {keys} keys to {path}")
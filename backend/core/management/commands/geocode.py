@@ -1,35 +1,34 @@
+from concurrent.futures import ThreadPoolExecutor
+
 import djclick as click
-import httpx
-from django.contrib.gis.geos import Point
-from django.db import transaction
+from django.utils import timezone
 
-from core.models import JobOpening
+from core.geocoding import GeocodingWorker, Progress, due_openings
+from core.tasks import geocode_task
 
 
 @click.command()
-def command():
-    queryset = JobOpening.objects.filter(location__isnull=True)
-    while queryset.exists():
-        with transaction.atomic():
-            o: JobOpening = queryset.select_for_update(skip_locked=True).first()
+@click.option("--workers", default=2, show_default=True, help="Number of workers claiming batches in parallel.")
+@click.option("--batch-size", default=50, show_default=True, help="Number of openings a worker claims at once.")
+@click.option("--concurrency", default=8, show_default=True, help="Concurrent Photon lookups per worker.")
+@click.option("--enqueue", is_flag=True, help="Run the workers as tasks on the geocode queue instead of in-process.")
+def command(workers, batch_size, concurrency, enqueue):
+    if not due_openings(timezone.now()).exists():
+        print("There are no jobs that need geocoding.")
+        return
 
-            print("geocoding: ", o)
-            parts_for_geocoding = [o.company_name, o.address, o.zip, o.city]
+    if enqueue:
+        for _ in range(workers):
+            geocode_task.enqueue(batch_size=batch_size, concurrency=concurrency)
+        print(f"Enqueued {workers} geocoding tasks.")
+        return
 
-            while parts_for_geocoding:
-                full_address = ", ".join(filter(lambda p: len(p), parts_for_geocoding))
-                resp = httpx.get("http://localhost:2322/api/", params={"q": full_address}).raise_for_status()
-                data = resp.json()
-                features = data["features"]
-                if features:
-                    geom = features[0]["geometry"]
-                    o.location = Point(*geom["coordinates"], srid=4326)
-                    break
-                else:
-                    parts_for_geocoding = parts_for_geocoding[1:]
-            if not o.location:
-                o.location = Point(0, 0)
-            o.save()
-    else:
-        print("There are no jobs that need geocoding.")
+    progress = Progress()
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(GeocodingWorker(batch_size=batch_size, concurrency=concurrency, progress=progress).run)
+            for _ in range(workers)
+        ]
+        for future in futures:
+            future.result()
     print("Geocoding complete.")
@@ -0,0 +1,37 @@
+import csv
+
+import djclick as click
+from django.contrib.gis.geos import Point
+
+from core.models import Place
+from core.places import CANTONS
+
+
+@click.command()
+@click.argument("csv_file", type=click.File(encoding="utf-8-sig"))
+def command(csv_file):
+    """
+    Loads the Swiss municipalities and localities from the official directory of localities (swisstopo
+    "Amtliches Ortschaftenverzeichnis", the CSV variant with WGS84 coordinates).
+    """
+    places = {}
+    for row in csv.DictReader(csv_file, delimiter=";"):
+        state = CANTONS.get(row["Kantonskürzel"], row["Kantonskürzel"])
+        location = Point(float(row["E"]), float(row["N"]), srid=4326)
+        # the directory has a row per locality and zip code, the first one wins. Municipalities have no coordinates
+        # of their own, they get the ones of their first locality
+        places.setdefault((row["Ortschaftsname"], state), (Place.Kind.LOCALITY, location))
+        municipality = (row["Gemeindename"], state)
+        if places.get(municipality, (None,))[0] != Place.Kind.MUNICIPALITY:
+            places[municipality] = (Place.Kind.MUNICIPALITY, location)
+
+    Place.objects.bulk_create(
+        [
+            Place(name=name, state=state, kind=kind, location=location)
+            for (name, state), (kind, location) in places.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["name", "state"],
+        update_fields=["kind", "location"],
+    )
+    print(f"Loaded {len(places)} places")
@@ -0,0 +1,36 @@
+import asyncio
+
+import djclick as click
+from django.conf import settings
+
+from core import upstream
+from core.models import Hub, HubTravelTime
+from core.travel_times import precompute
+
+
+@click.command()
+@click.option("--hub", "hub_names", multiple=True, help="Only these hubs (by name), defaults to all.")
+@click.option("--profile", "profiles", multiple=True, help="Only these profiles, defaults to TRAVEL_TIME_PROFILES.")
+@click.option("--rebuild", is_flag=True, help="Drop the stored travel times first, e.g. after a graph rebuild.")
+def command(hub_names, profiles, rebuild):
+    """Computes the missing travel times from the hubs to all geocoded jobs."""
+    hubs = Hub.objects.all()
+    if hub_names:
+        hubs = hubs.filter(name__in=hub_names)
+    profiles = profiles or settings.TRAVEL_TIME_PROFILES
+
+    if rebuild:
+        HubTravelTime.objects.filter(hub__in=hubs, profile__in=profiles).delete()
+        for hub in hubs:
+            hub.ready_profiles = [p for p in hub.ready_profiles if p not in profiles]
+            hub.save(update_fields=["ready_profiles"])
+
+    async def run():
+        try:
+            async for hub in hubs:
+                for profile in profiles:
+                    await precompute(hub, profile)
+        finally:
+            await upstream.close_clients()
+
+    asyncio.run(run())
@@ -0,0 +1,70 @@
+import asyncio
+import time
+
+import djclick as click
+import httpx
+
+from core.scraper.ostjob_scraper import OstjobScraper
+from core.scraper.pagination import PageFetchError
+
+PAGE_SIZES = [10, 20, 50, 100, 200, 500, 1000]
+
+
+async def largest_page_size(scraper: OstjobScraper, client: httpx.AsyncClient) -> int | None:
+    """Returns the largest page size the API serves in full, it either rejects or silently caps larger ones."""
+    largest = None
+    for page_size in PAGE_SIZES:
+        scraper.page_size = page_size
+        try:
+            data = await scraper._paginator(client).get(1)
+        except PageFetchError as e:
+            print(f"pageSize={page_size}: rejected ({e})")
+            break
+        items = len(data.get("items") or [])
+        total = data.get("total") or data.get("totalCount")
+        print(f"pageSize={page_size}: {items} items")
+        if items < page_size and (total is None or total > items):
+            break
+        largest = page_size
+        if items < page_size:
+            # there are fewer results than the page size, larger sizes can't be told apart
+            break
+    return largest
+
+
+async def measure_throughput(scraper: OstjobScraper, client: httpx.AsyncClient, pages: int):
+    paginator = scraper._paginator(client)
+    started = time.perf_counter()
+    first = await paginator.get(1)
+    pages = min(pages, first.get("pages") or 1)
+    results = [first, *await paginator.get_many(range(2, pages + 1))]
+    elapsed = time.perf_counter() - started
+    items = sum(len(r.get("items") or []) for r in results)
+    print(
+        f"{pages} pages / {items} items in {elapsed:.2f}s: {pages / elapsed:.1f} pages/s, {items / elapsed:.1f} items/s"
+    )
+
+
+@click.command()
+@click.option("--api-url", default=OstjobScraper.API_URL, show_default=True, help="e.g. a local fake Ostjob server")
+@click.option("--query", "-q", multiple=True, default=["python"], show_default=True)
+@click.option("--page-size", type=int, help="Page size for the throughput test, probed if not given.")
+@click.option("--pages", default=20, show_default=True, help="Number of pages for the throughput test.")
+@click.option("--concurrency", default=3, show_default=True)
+@click.option("--requests-per-second", default=5.0, show_default=True)
+def command(api_url, query, page_size, pages, concurrency, requests_per_second):
+    """Probes the largest page size the Ostjob API accepts and measures the scraping throughput."""
+    scraper = OstjobScraper(
+        list(query), api_url=api_url, concurrency=concurrency, requests_per_second=requests_per_second
+    )
+
+    async def probe():
+        nonlocal page_size
+        async with httpx.AsyncClient(verify=False) as client:
+            if page_size is None:
+                page_size = await largest_page_size(scraper, client) or 10
+                print(f"Largest accepted page size: {page_size}")
+            scraper.page_size = page_size
+            await measure_throughput(scraper, client, pages)
+
+    asyncio.run(probe())
@@ -1,11 +1,12 @@
 import djclick as click
+from django.conf import settings
+
 from core.tasks import run_scraper_task
 
 
 @click.command()
-def command():
-    scrapers = ["core.scraper.ostjob_scraper.OstjobScraper"]
-
+@click.option("--full", is_flag=True, help="Fetch every page, instead of only what changed since the last run.")
+def command(full):
     query = {
         "python",
         "vue",
@@ -28,7 +29,7 @@ def command():
         ".net",
     }
 
-    for s in scrapers:
-        run_scraper_task.enqueue(scraper_name=s, search_query=list(query))
+    for s in settings.SCRAPERS:
+        run_scraper_task.enqueue(scraper_name=s, search_query=list(query), full=full)
 
-    print("Running scraper...")
+    print("Enqueued scrapers, they are run by `manage.py run_workers`.")
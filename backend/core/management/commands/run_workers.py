@@ -0,0 +1,91 @@
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import djclick as click
+from django.conf import settings
+
+# a worker that exits within this many seconds of its start failed to start, e.g. because it can't import the settings
+MIN_UPTIME = 10
+# workers that fail to start this many times in a row aren't restarted anymore
+MAX_FAILED_STARTS = 5
+
+
+def start_worker(queue_name: str, index: int) -> subprocess.Popen:
+    # through manage.py, so the settings are found wherever the supervisor was started from
+    return subprocess.Popen(
+        [
+            sys.executable,
+            str(settings.BASE_DIR / "manage.py"),
+            "db_worker",
+            "--queue-name",
+            queue_name,
+            "--worker-id",
+            f"{socket.gethostname()}-{queue_name}-{index}"[-64:],
+            "--no-reload",
+        ],
+        cwd=settings.BASE_DIR,
+    )
+
+
+@click.command()
+@click.option(
+    "--queue",
+    "-q",
+    "queues",
+    multiple=True,
+    help="Worker processes per queue as NAME=COUNT, e.g. -q scraper=4. Defaults to settings.TASK_WORKERS.",
+)
+def command(queues):
+    """
+    Starts a pool of `db_worker` processes and restarts the ones that die, until it is stopped. Workers that keep
+    exiting right after their start are given up on.
+    """
+    worker_counts = dict(settings.TASK_WORKERS)
+    for q in queues:
+        name, _, count = q.partition("=")
+        worker_counts[name] = int(count or 1)
+
+    workers = {
+        (queue_name, i): start_worker(queue_name, i)
+        for queue_name, count in worker_counts.items()
+        for i in range(count)
+    }
+    started_at = dict.fromkeys(workers, time.monotonic())
+    failed_starts = dict.fromkeys(workers, 0)
+    print(f"Started {len(workers)} workers: {worker_counts}")
+
+    running = True
+
+    def stop(signum, frame):
+        nonlocal running
+        running = False
+
+    signal.signal(signal.SIGINT, stop)
+    signal.signal(signal.SIGTERM, stop)
+
+    while running and workers:
+        for (queue_name, i), process in list(workers.items()):
+            if process.poll() is None:
+                continue
+            key = (queue_name, i)
+            if time.monotonic() - started_at[key] < MIN_UPTIME:
+                failed_starts[key] += 1
+            else:
+                failed_starts[key] = 0
+            if failed_starts[key] >= MAX_FAILED_STARTS:
+                print(f"Worker {queue_name}-{i} exited right after starting {MAX_FAILED_STARTS} times, giving up on it")
+                del workers[key]
+                continue
+            print(f"Worker {queue_name}-{i} exited with {process.returncode}, restarting it")
+            workers[key] = start_worker(queue_name, i)
+            started_at[key] = time.monotonic()
+        time.sleep(1)
+
+    print("Stopping workers...")
+    for process in workers.values():
+        process.send_signal(signal.SIGTERM)
+    for process in workers.values():
+        process.wait()
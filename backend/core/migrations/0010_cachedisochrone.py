@@ -0,0 +1,25 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_rename_workplace_city_jobopening_city_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CachedIsochrone',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=255, unique=True)),
+                ('profile', models.CharField(max_length=64)),
+                ('travel_time_seconds', models.IntegerField()),
+                ('graph_version', models.CharField(db_index=True, max_length=64)),
+                ('data', models.JSONField(help_text='The isochrone response as returned by GraphHopper.')),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
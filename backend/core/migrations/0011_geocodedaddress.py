@@ -0,0 +1,24 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:17
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_cachedisochrone'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeocodedAddress',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('query', models.CharField(max_length=1024, unique=True)),
+                ('location', django.contrib.gis.db.models.fields.PointField(blank=True, help_text='Empty if Photon found nothing.', null=True, srid=4326)),
+                ('confidence', models.FloatField(help_text='Share of the address parts that were used by the successful query.')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+    ]
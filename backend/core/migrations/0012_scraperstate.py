@@ -0,0 +1,28 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_geocodedaddress'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ScraperState',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('scraper', models.CharField(max_length=255)),
+                ('query', models.CharField(max_length=1024)),
+                ('last_run_at', models.DateTimeField(blank=True, null=True)),
+                ('last_full_run_at', models.DateTimeField(blank=True, null=True)),
+                ('watermark', models.DateTimeField(blank=True, help_text='The most recent `first_published_at` of all items seen so far.', null=True)),
+                ('item_hashes', models.JSONField(default=dict, help_text='Content hash and JobOpening id of every item seen, by the unique key of the opening.')),
+            ],
+            options={
+                'unique_together': {('scraper', 'query')},
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:25
+
+import django.contrib.gis.db.models.fields
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_scraperstate'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Hub',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255, unique=True)),
+                ('location', django.contrib.gis.db.models.fields.PointField(srid=4326)),
+                ('radius_meters', models.IntegerField(default=1000, help_text='Origins within this radius are answered by the hub.')),
+                ('ready_profiles', models.JSONField(blank=True, default=list, help_text='The profiles whose travel times have been computed for all jobs.')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='HubTravelTime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profile', models.CharField(max_length=64)),
+                ('travel_seconds', models.IntegerField(blank=True, help_text='Empty if there is no route.', null=True)),
+                ('distance_meters', models.IntegerField(blank=True, null=True)),
+                ('computed_at', models.DateTimeField(auto_now=True)),
+                ('hub', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='travel_times', to='core.hub')),
+                ('job', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='hub_travel_times', to='core.jobopening')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['hub', 'profile', 'travel_seconds'], name='core_hubtra_hub_id_1d4986_idx')],
+                'unique_together': {('hub', 'profile', 'job')},
+            },
+        ),
+    ]
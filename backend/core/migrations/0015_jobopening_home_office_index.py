@@ -0,0 +1,16 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("core", "0014_jobopening_search_vector"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="jobopening",
+            index=models.Index(fields=["home_office"], name="core_jobope_home_of_3d5b40_idx"),
+        ),
+    ]
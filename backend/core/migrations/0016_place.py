@@ -0,0 +1,27 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:35
+
+import django.contrib.gis.db.models.fields
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_jobopening_home_office_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Place',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('state', models.CharField(help_text='Canton', max_length=64)),
+                ('kind', models.CharField(choices=[('municipality', 'Municipality'), ('locality', 'Locality')], max_length=16)),
+                ('location', django.contrib.gis.db.models.fields.PointField(srid=4326)),
+            ],
+            options={
+                'unique_together': {('name', 'state')},
+            },
+        ),
+    ]
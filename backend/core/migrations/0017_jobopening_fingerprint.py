@@ -0,0 +1,43 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:40
+
+import django.contrib.postgres.fields
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_place'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='scraperstate',
+            name='item_hashes',
+        ),
+        migrations.AddField(
+            model_name='jobopening',
+            name='content_hash',
+            field=models.CharField(blank=True, help_text='Hash of `raw_data`, to detect changes.', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='jobopening',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, help_text='Hash of the normalised title, company and description.', max_length=32),
+        ),
+        migrations.AddField(
+            model_name='jobopening',
+            name='minhash',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, size=None),
+        ),
+        migrations.AddField(
+            model_name='jobopening',
+            name='minhash_bands',
+            field=django.contrib.postgres.fields.ArrayField(base_field=models.BigIntegerField(), blank=True, default=list, size=None),
+        ),
+        migrations.AddIndex(
+            model_name='jobopening',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['minhash_bands'], name='core_jobope_minhash_700ea2_gin'),
+        ),
+    ]
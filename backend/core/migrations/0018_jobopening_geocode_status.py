@@ -0,0 +1,62 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:44
+
+import django.contrib.gis.db.models.fields
+from django.contrib.gis.geos import Point
+import django.contrib.postgres.indexes
+import django.utils.timezone
+from django.db import migrations, models
+
+
+def set_geocode_status(apps, schema_editor):
+    JobOpening = apps.get_model("core", "JobOpening")
+    # Point(0, 0) marked addresses that weren't found, retry them right away
+    JobOpening.objects.filter(location__equals=Point(0, 0, srid=4326)).update(
+        location=None, geocode_status="not_found", geocode_attempts=1
+    )
+    JobOpening.objects.filter(location__isnull=False).update(
+        geocode_status="found", geocode_attempts=1, geocode_due_at=None
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_jobopening_fingerprint'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='jobopening',
+            name='geocode_attempted_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobopening',
+            name='geocode_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='jobopening',
+            name='geocode_due_at',
+            field=models.DateTimeField(blank=True, default=django.utils.timezone.now, help_text='When to (try to) geocode next, empty once found.', null=True),
+        ),
+        migrations.AddField(
+            model_name='jobopening',
+            name='geocode_status',
+            field=models.CharField(choices=[('pending', 'Pending'), ('found', 'Found'), ('not_found', 'Not Found')], default='pending', max_length=16),
+        ),
+        migrations.RunPython(set_geocode_status, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='jobopening',
+            name='location',
+            field=django.contrib.gis.db.models.fields.PointField(blank=True, null=True, spatial_index=False, srid=4326),
+        ),
+        migrations.AddIndex(
+            model_name='jobopening',
+            index=django.contrib.postgres.indexes.GistIndex(condition=models.Q(('location__isnull', False)), fields=['location'], name='jobopening_location_gist'),
+        ),
+        migrations.AddIndex(
+            model_name='jobopening',
+            index=models.Index(condition=models.Q(('geocode_due_at__isnull', False)), fields=['geocode_due_at'], name='jobopening_geocode_due'),
+        ),
+    ]
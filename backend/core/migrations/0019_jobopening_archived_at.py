@@ -0,0 +1,31 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:46
+
+import django.contrib.postgres.indexes
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_jobopening_geocode_status'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='jobopening',
+            name='jobopening_location_gist',
+        ),
+        migrations.AddField(
+            model_name='jobopening',
+            name='archived_at',
+            field=models.DateTimeField(blank=True, help_text='When the opening was archived as stale, empty while it is active.', null=True),
+        ),
+        migrations.AddIndex(
+            model_name='jobopening',
+            index=django.contrib.postgres.indexes.GistIndex(condition=models.Q(('archived_at__isnull', True), ('location__isnull', False)), fields=['location'], name='jobopening_active_location'),
+        ),
+        migrations.AddIndex(
+            model_name='jobopening',
+            index=models.Index(condition=models.Q(('archived_at__isnull', True)), fields=['last_seen_at'], name='jobopening_active_last_seen'),
+        ),
+    ]
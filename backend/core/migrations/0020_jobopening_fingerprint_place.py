@@ -0,0 +1,36 @@
+# Generated by Django 5.2.6 on 2026-10-18 13:57
+
+from django.db import migrations, models
+
+
+def recompute_fingerprints(apps, schema_editor):
+    from core.dedup import fingerprint
+
+    JobOpening = apps.get_model("core", "JobOpening")
+    openings = JobOpening.objects.only("id", "title", "company_name", "description", "zip", "city")
+    batch = []
+    for opening in openings.iterator(chunk_size=1000):
+        opening.fingerprint = fingerprint(
+            opening.title, opening.company_name, opening.description, opening.zip, opening.city
+        )
+        batch.append(opening)
+        if len(batch) == 1000:
+            JobOpening.objects.bulk_update(batch, ["fingerprint"])
+            batch = []
+    JobOpening.objects.bulk_update(batch, ["fingerprint"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_jobopening_archived_at'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobopening',
+            name='fingerprint',
+            field=models.CharField(blank=True, db_index=True, help_text='Hash of the normalised title, company, place and description.', max_length=32),
+        ),
+        migrations.RunPython(recompute_fingerprints, migrations.RunPython.noop),
+    ]
@@ -1,5 +1,56 @@
 from django.contrib.gis.db import models
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
+from django.db.models import Case, F, Func, Q, When
+from django.db.models.fields.json import KT
 from django.db.models.functions import Cast
+from django.db.models.lookups import Exact
+from django.utils import timezone
+
+
+class JSONBTypeOf(Func):
+    function = "jsonb_typeof"
+    output_field = models.TextField()
+
+
+def raw_data_field(key: str, output_field: models.Field) -> models.GeneratedField:
+    """
+    Promotes ``raw_data[key]`` to a persisted and indexed column, so it can be filtered on without reading the JSON.
+
+    Values of an unexpected JSON type (e.g. a string where a number is expected) become NULL instead of failing the
+    insert. Text fields must be `TextField`s, longer values than a `CharField` allows would fail as well. A key that
+    the source doesn't send gives a column that is always NULL, so only promote keys seen in a captured item.
+    """
+    value = F(f"raw_data__{key}")
+    if isinstance(output_field, models.TextField):
+        json_type, expression = "string", KT(f"raw_data__{key}")
+    elif isinstance(output_field, models.BooleanField):
+        json_type, expression = "boolean", Cast(value, output_field)
+    else:
+        json_type, expression = "number", Cast(value, output_field)
+    return models.GeneratedField(
+        expression=Case(When(Exact(JSONBTypeOf(value), json_type), then=expression)),
+        output_field=output_field,
+        db_persist=True,
+        db_index=True,
+    )
+
+
+def search_vector(config: str) -> SearchVector:
+    return (
+        SearchVector("title", weight="A", config=config)
+        + SearchVector("company_name", weight="B", config=config)
+        + SearchVector("description", weight="C", config=config)
+    )
+
+
+class JobOpeningQuerySet(models.QuerySet):
+    def active(self):
+        return self.filter(archived_at__isnull=True)
+
+    def archived(self):
+        return self.filter(archived_at__isnull=False)
 
 
 class JobOpening(models.Model):
@@ -11,12 +62,42 @@ class JobOpening(models.Model):
                 "zip",
             ),
         )
+        indexes = [
+            GinIndex(fields=["search_vector"]),
+            models.Index(fields=["home_office"]),
+            GinIndex(fields=["minhash_bands"]),
+            # only active, geocoded openings are ever searched spatially
+            GistIndex(
+                fields=["location"],
+                condition=Q(location__isnull=False, archived_at__isnull=True),
+                name="jobopening_active_location",
+            ),
+            # for archiving the active openings that weren't seen for a while
+            models.Index(
+                fields=["last_seen_at"], condition=Q(archived_at__isnull=True), name="jobopening_active_last_seen"
+            ),
+            # the openings to geocode, in the order they are due
+            models.Index(
+                fields=["geocode_due_at"], condition=Q(geocode_due_at__isnull=False), name="jobopening_geocode_due"
+            ),
+        ]
+
+    class GeocodeStatus(models.TextChoices):
+        PENDING = "pending"
+        FOUND = "found"
+        NOT_FOUND = "not_found"
 
     company_name = models.CharField(max_length=255, db_index=True)
     title = models.CharField(max_length=255)
     description = models.TextField()
 
-    location = models.PointField(srid=4326, blank=True, null=True)
+    location = models.PointField(srid=4326, blank=True, null=True, spatial_index=False)
+    geocode_status = models.CharField(max_length=16, choices=GeocodeStatus, default=GeocodeStatus.PENDING)
+    geocode_attempts = models.PositiveSmallIntegerField(default=0)
+    geocode_attempted_at = models.DateTimeField(null=True, blank=True)
+    geocode_due_at = models.DateTimeField(
+        null=True, blank=True, default=timezone.now, help_text="When to (try to) geocode next, empty once found."
+    )
 
     zip = models.CharField(max_length=20, blank=True)
     city = models.CharField(max_length=255, blank=True)
@@ -31,6 +112,9 @@ class JobOpening(models.Model):
     first_published_at = models.DateTimeField(null=True, blank=True)
     first_seen_at = models.DateTimeField(auto_now_add=True)
     last_seen_at = models.DateTimeField(auto_now=True)
+    archived_at = models.DateTimeField(
+        null=True, blank=True, help_text="When the opening was archived as stale, empty while it is active."
+    )
 
     home_office = models.GeneratedField(
         expression=Cast("raw_data__homeOffice", models.BooleanField()),
@@ -48,5 +132,119 @@ class JobOpening(models.Model):
         default=dict, help_text="A list of the raw JSON objects from each source, in the same order as the URLs."
     )
 
+    fingerprint = models.CharField(
+        max_length=32,
+        blank=True,
+        db_index=True,
+        help_text="Hash of the normalised title, company, place and description.",
+    )
+    content_hash = models.CharField(max_length=32, blank=True, help_text="Hash of `raw_data`, to detect changes.")
+    # see core/dedup.py
+    minhash = ArrayField(models.BigIntegerField(), default=list, blank=True)
+    minhash_bands = ArrayField(models.BigIntegerField(), default=list, blank=True)
+
+    # job ads are mostly German, some French. Both stemmings are indexed, so queries in either language match
+    search_vector = models.GeneratedField(
+        expression=search_vector("german") + search_vector("french"),
+        output_field=SearchVectorField(),
+        db_persist=True,
+    )
+
+    objects = JobOpeningQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.title} at {self.company_name}"
+
+
+class CachedIsochrone(models.Model):
+    """Persistent tier of the isochrone cache, see core/isochrones.py"""
+
+    key = models.CharField(max_length=255, unique=True)
+    profile = models.CharField(max_length=64)
+    travel_time_seconds = models.IntegerField()
+    graph_version = models.CharField(max_length=64, db_index=True)
+    data = models.JSONField(help_text="The isochrone response as returned by GraphHopper.")
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.key
+
+
+class GeocodedAddress(models.Model):
+    """Cache of Photon lookups by normalised address, see core/geocoding.py"""
+
+    query = models.CharField(max_length=1024, unique=True)
+    location = models.PointField(srid=4326, blank=True, null=True, help_text="Empty if Photon found nothing.")
+    confidence = models.FloatField(help_text="Share of the address parts that were used by the successful query.")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.query
+
+
+class Place(models.Model):
+    """Swiss municipalities and localities, answers place searches locally, see core/places.py"""
+
+    class Kind(models.TextChoices):
+        MUNICIPALITY = "municipality"
+        LOCALITY = "locality"
+
+    class Meta:
+        unique_together = (("name", "state"),)
+
+    name = models.CharField(max_length=255)
+    state = models.CharField(max_length=64, help_text="Canton")
+    kind = models.CharField(max_length=16, choices=Kind)
+    location = models.PointField(srid=4326)
+
+    def __str__(self):
+        return f"{self.name} ({self.state})"
+
+
+class ScraperState(models.Model):
+    """Progress of a scraper per query, used for incremental runs, see core/ingest.py"""
+
+    class Meta:
+        unique_together = (("scraper", "query"),)
+
+    scraper = models.CharField(max_length=255)
+    query = models.CharField(max_length=1024)
+
+    last_run_at = models.DateTimeField(null=True, blank=True)
+    last_full_run_at = models.DateTimeField(null=True, blank=True)
+    watermark = models.DateTimeField(
+        null=True, blank=True, help_text="The most recent `first_published_at` of all items seen so far."
+    )
+
+    def __str__(self):
+        return f"{self.scraper}: {self.query}"
+
+
+class Hub(models.Model):
+    """A popular origin, travel times from hubs to every job are precomputed, see core/travel_times.py"""
+
+    name = models.CharField(max_length=255, unique=True)
+    location = models.PointField(srid=4326)
+    radius_meters = models.IntegerField(default=1000, help_text="Origins within this radius are answered by the hub.")
+    ready_profiles = models.JSONField(
+        default=list, blank=True, help_text="The profiles whose travel times have been computed for all jobs."
+    )
+
+    def __str__(self):
+        return self.name
+
+
+class HubTravelTime(models.Model):
+    class Meta:
+        unique_together = (("hub", "profile", "job"),)
+        indexes = [models.Index(fields=["hub", "profile", "travel_seconds"])]
+
+    hub = models.ForeignKey(Hub, on_delete=models.CASCADE, related_name="travel_times")
+    job = models.ForeignKey(JobOpening, on_delete=models.CASCADE, related_name="hub_travel_times")
+    profile = models.CharField(max_length=64)
+    travel_seconds = models.IntegerField(null=True, blank=True, help_text="Empty if there is no route.")
+    distance_meters = models.IntegerField(null=True, blank=True)
+    computed_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.hub} -> {self.job_id} ({self.profile})"
@@ -0,0 +1,128 @@
+"""
+Place search (autocomplete).
+
+Every keystroke in the search field is a request, so:
+
+- queries are normalised and the location bias is rounded to ``BIAS_DECIMALS``, so nearby users share cache entries
+- results are kept in a size-bounded LRU with a TTL
+- identical requests in flight at the same time are sent to Photon only once (`SingleFlight`)
+- if a cached result for a shorter prefix of the query was complete (fewer results than the limit), the results for
+  the longer query are taken from it
+
+Before any of this, the query is looked up in the local gazetteer of Swiss municipalities and localities (see
+core/gazetteer.py, built with ``manage.py load_places`` and ``manage.py build_gazetteer``). Photon is only asked if
+no place starts with the query (e.g. for typos), or too many to rank them all (e.g. for a single letter).
+"""
+
+import copy
+import os
+
+from django.conf import settings
+
+from . import upstream
+from .cache import LRUCache, SingleFlight
+from .gazetteer import Gazetteer, normalize
+from .timing import record_cache_lookup, timed
+
+CANTONS = {
+    "AG": "Aargau",
+    "AI": "Appenzell Innerrhoden",
+    "AR": "Appenzell Ausserrhoden",
+    "BE": "Bern/Berne",
+    "BL": "Basel-Landschaft",
+    "BS": "Basel-Stadt",
+    "FR": "Fribourg/Freiburg",
+    "GE": "Genève",
+    "GL": "Glarus",
+    "GR": "Graubünden/Grischun/Grigioni",
+    "JU": "Jura",
+    "LU": "Luzern",
+    "NE": "Neuchâtel",
+    "NW": "Nidwalden",
+    "OW": "Obwalden",
+    "SG": "St. Gallen",
+    "SH": "Schaffhausen",
+    "SO": "Solothurn",
+    "SZ": "Schwyz",
+    "TG": "Thurgau",
+    "TI": "Ticino",
+    "UR": "Uri",
+    "VD": "Vaud",
+    "VS": "Valais/Wallis",
+    "ZG": "Zug",
+    "ZH": "Zürich",
+}
+
+_cache = LRUCache(max_bytes=settings.PLACE_SEARCH["MEMORY_MAX_BYTES"], ttl=settings.PLACE_SEARCH["TTL"])
+_single_flight = SingleFlight()
+_gazetteer: tuple[Gazetteer, float] | None = None
+
+
+def get_gazetteer() -> Gazetteer | None:
+    """The gazetteer at ``GAZETTEER_PATH``, reopened when it was rebuilt. None if it wasn't built yet."""
+    global _gazetteer
+
+    path = settings.PLACE_SEARCH["GAZETTEER_PATH"]
+    try:
+        modified_at = os.stat(path).st_mtime
+    except FileNotFoundError:
+        return None
+    if _gazetteer is None or _gazetteer[1] != modified_at:
+        if _gazetteer is not None:
+            _gazetteer[0].close()
+        _gazetteer = (Gazetteer(path), modified_at)
+    return _gazetteer[0]
+
+
+def from_shorter_prefix(query: str, lat: float, lon: float, zoom: int) -> list | None:
+    """Filters a complete cached result of a shorter prefix of the query, if there is one."""
+    for length in range(len(query) - 1, 0, -1):
+        features = _cache.get((query[:length], lat, lon, zoom))
+        if features is None:
+            continue
+        if len(features) >= settings.PLACE_SEARCH["LIMIT"]:
+            # Photon may have cut off matches for the longer query
+            return None
+        return [f for f in features if normalize(f.get("properties", {}).get("name", "")).startswith(query)]
+    return None
+
+
+async def fetch_places(query: str, lat: float, lon: float, zoom: int) -> list:
+    resp = await upstream.photon.get(
+        "/api",
+        params={
+            "q": query,
+            "limit": settings.PLACE_SEARCH["LIMIT"],
+            "lat": lat,
+            "lon": lon,
+            "location_bias_scale": 0.2,
+            "zoom": zoom,
+            "layer": ["city", "locality"],
+        },
+    )
+    features = resp.json().get("features", [])
+    _cache.set((query, lat, lon, zoom), features, size=len(resp.content))
+    return features
+
+
+async def search_places(*, query: str, lat: float, lon: float, zoom: int) -> list:
+    """Photon features (layers city and locality) matching the query, biased towards the given location."""
+    limit = settings.PLACE_SEARCH["LIMIT"]
+    with timed("gazetteer"):
+        if (gazetteer := get_gazetteer()) and (features := gazetteer.search(query, limit=limit, lat=lat, lon=lon)):
+            return features
+
+    query = normalize(query)
+    decimals = settings.PLACE_SEARCH["BIAS_DECIMALS"]
+    lat, lon = round(lat, decimals), round(lon, decimals)
+    key = (query, lat, lon, zoom)
+
+    features = _cache.get(key)
+    if features is None:
+        features = from_shorter_prefix(query, lat, lon, zoom)
+    # the cache isn't named, the lookups of the shorter prefixes would all count as misses
+    record_cache_lookup("place", features is not None)
+    if features is None:
+        features = await _single_flight.run(key, lambda: fetch_places(query, lat, lon, zoom))
+    # the caller adds flags to the properties, the cached features must stay untouched
+    return copy.deepcopy(features)
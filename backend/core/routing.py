@@ -0,0 +1,50 @@
+"""
+Point to point routing with GraphHopper.
+
+The open source GraphHopper has no matrix endpoint, so one-to-many requests are answered with concurrent ``/route``
+requests. The pooled upstream client limits how many of them are in flight.
+"""
+
+import asyncio
+from collections.abc import Hashable
+from dataclasses import dataclass
+
+import httpx
+
+from . import upstream
+
+Coordinates = tuple[float, float]  # (lon, lat), like GEOS and GeoJSON
+
+
+@dataclass(frozen=True)
+class Route:
+    distance_meters: float
+    time_seconds: float
+
+
+async def route(origin: Coordinates, destination: Coordinates, profile: str) -> Route | None:
+    """Returns the fastest route, or None if GraphHopper can't connect the two points."""
+    request_params = {
+        "profile": profile,
+        "points": [origin, destination],
+        "instructions": False,
+        "calc_points": False,
+    }
+    try:
+        resp = await upstream.graphhopper.post("/route", json=request_params)
+    except httpx.HTTPStatusError as e:
+        # GraphHopper answers with 400 if a point can't be snapped to the road network or there is no connection
+        if e.response.status_code == 400:
+            return None
+        raise
+    path = resp.json()["paths"][0]
+    return Route(distance_meters=path["distance"], time_seconds=path["time"] / 1000)
+
+
+async def one_to_many(
+    origin: Coordinates, destinations: dict[Hashable, Coordinates], profile: str
+) -> dict[Hashable, Route | None]:
+    async def route_to(key: Hashable, destination: Coordinates):
+        return key, await route(origin, destination, profile)
+
+    return dict(await asyncio.gather(*(route_to(k, d) for k, d in destinations.items())))
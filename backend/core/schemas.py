@@ -1,4 +1,4 @@
-from ninja import ModelSchema, Schema
+from ninja import Field, FilterSchema, ModelSchema, Schema
 from ninja.orm import register_field
 
 from core.models import JobOpening
@@ -50,15 +50,57 @@ class IsochroneOut(Schema):
     polygons: list[IsoPolygon]
 
 
+class EncodedIsoPolygon(Schema):
+    rings: list[str]  # encoded polylines, (lat, lon) order
+
+
+class EncodedIsochroneOut(Schema):
+    precision: int  # decimals of the encoded coordinates, needed to decode the polylines
+    polygons: list[EncodedIsoPolygon]
+
+
+class IsochroneBand(Schema):
+    travel_time_minutes: int  # upper bound of the band, the band contains everything reachable within this time
+    polygons: list[IsoPolygon]
+
+
+class IsochroneBandsOut(Schema):
+    bands: list[IsochroneBand]  # innermost first
+
+
 class JobOpeningOut(ModelSchema):
     id: int
     location: list[float] = None
+    band: int | None = None  # travel time of the innermost band containing the job, only set if bands were requested
 
     class Meta:
         model = JobOpening
         fields = ["id", "title", "company_name", "location", "description", "address", "city"]
 
 
+class JobOpeningListOut(ModelSchema):
+    """Slim variant of `JobOpeningOut` for lists, the details are loaded on demand via /jobs/{id}."""
+
+    id: int
+    location: list[float] = None
+    band: int | None = None
+
+    class Meta:
+        model = JobOpening
+        fields = ["id", "title", "company_name", "location"]
+
+
+class JobFilters(FilterSchema):
+    """Filters on the columns promoted from `raw_data`, jobs without a value are excluded once a filter is set."""
+
+    home_office: bool | None = None
+
+
+class JobOpeningPage(Schema):
+    items: list[JobOpeningListOut]
+    next_cursor: int | None = None  # pass this as `cursor` to get the next page, None if this is the last one
+
+
 class Point(Schema):
     lat: float
     lon: float
@@ -68,3 +110,15 @@ class DistanceCalculation(Schema):
     job_id: int
     abfahrtsort: Point
     profile: str
+
+
+class TravelDistancesIn(Schema):
+    abfahrtsort: Point
+    profile: str
+    job_ids: list[int] = Field(..., max_length=500)
+
+
+class TravelDistance(Schema):
+    job_id: int
+    distance_km: float | None = None  # None if there is no route to the job
+    travel_time_minutes: int | None = None
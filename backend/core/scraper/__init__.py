@@ -1,10 +1,37 @@
 from abc import ABC, abstractmethod
+from collections.abc import AsyncIterator
+from datetime import datetime
 
 
 class BaseScraper(ABC):
-    def __init__(self, query: list[str]):
+    """
+    Scrapers implement either `pages`, which yields the items page by page as they arrive, or `scrape`, which returns
+    all items at once. Each of the two methods is adapted to the other one by default.
+
+    If `since` is given, the scraper may stop early once it only gets items published before that date. Scrapers that
+    can't order their results by date simply ignore it.
+    """
+
+    def __init__(self, query: list[str], since: datetime | None = None):
         self.query = query
+        self.since = since
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        if cls.pages is BaseScraper.pages and cls.scrape is BaseScraper.scrape:
+            raise TypeError(f"{cls.__name__} must implement either pages() or scrape()")
+
+    async def pages(self) -> AsyncIterator[list[dict]]:
+        yield await self.scrape()
 
-    @abstractmethod
     async def scrape(self) -> list[dict]:
+        return [item async for page in self.pages() for item in page]
+
+    @abstractmethod
+    def normalize(self, item: dict) -> dict | None:
+        """
+        Maps a scraped item to the field values of a `JobOpening`, see core/ingest.py.
+
+        Returns None for items that should not be ingested.
+        """
         pass
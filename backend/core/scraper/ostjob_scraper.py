@@ -1,9 +1,12 @@
-import asyncio
-import random
+from collections.abc import AsyncIterator
+from datetime import datetime
 
 import httpx
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
 
 from . import BaseScraper
+from .pagination import Paginator
 
 
 def _parenthesize(val: str):
@@ -13,53 +16,141 @@ def _parenthesize(val: str):
 class OstjobScraper(BaseScraper):
     API_URL = "https://api.ostjob.ch/public/vacancy/search/"
 
+    def __init__(
+        self,
+        query: list[str],
+        since: datetime | None = None,
+        *,
+        api_url: str = API_URL,
+        page_size: int = 10,
+        concurrency: int = 3,
+        requests_per_second: float = 5.0,
+        transport: httpx.AsyncBaseTransport | None = None,
+    ):
+        """`transport` replaces the network, e.g. with an `httpx.MockTransport` serving a fake API in tests."""
+        super().__init__(query, since)
+        self.api_url = api_url
+        self.page_size = page_size
+        self.concurrency = concurrency
+        self.requests_per_second = requests_per_second
+        self.transport = transport
+
     def _get_query_params(self, page: int):
         query = " | ".join(map(_parenthesize, self.query))
         return {
             "search": _parenthesize(query),
             "page": page,
-            "pageSize": 10,
+            "pageSize": self.page_size,
             # "place": "Thurgau",
             # "placeType": "kanton",
             # "placeCode": "",
             # "placeValue": "Thurgau",
             # "pt": "kanton",
-            "order": "by_relevance",
+            # newest first for incremental runs, so paging can stop at the first known item
+            "order": "by_date" if self.since else "by_relevance",
             "relatedWords": "",
         }
 
-    async def _fetch_page(self, client: httpx.AsyncClient, page: int) -> dict | None:
+    async def _fetch_page(self, client: httpx.AsyncClient, page: int) -> dict:
         """Asynchronously fetches a single page of results."""
         params = self._get_query_params(page)
-        try:
-            response = await client.get(self.API_URL, params=params, timeout=15.0)
-            response.raise_for_status()
-            return response.json()
-        except (httpx.RequestError, httpx.HTTPStatusError) as e:
-            print(f"Error fetching page {page}: {e}")
+        response = await client.get(self.api_url, params=params, timeout=15.0)
+        response.raise_for_status()
+        return response.json()
+
+    def _paginator(self, client: httpx.AsyncClient) -> Paginator:
+        return Paginator(
+            lambda page: self._fetch_page(client, page),
+            concurrency=self.concurrency,
+            requests_per_second=self.requests_per_second,
+        )
+
+    def normalize(self, item: dict) -> dict | None:
+        company = item.get("company") or {}
+        company_name = company.get("name")
+        title = item.get("title")
+        if not company_name or not title:
             return None
 
-    async def scrape(self) -> list[dict]:
-        all_jobs = []
-
-        async with httpx.AsyncClient(verify=False) as client:
-            resp = await self._fetch_page(client, 1)
-            if resp:
-                all_jobs.extend(resp.get("items", []))
-                total_pages = resp.get("pages")
-                if total_pages > 1:
-                    tasks = []
-                    max_parallel_requests = 3
-                    for i, page_num in enumerate(range(2, total_pages + 1)):
-                        if not i % max_parallel_requests:
-                            sleep_time = random.randint(100, 1000) / 1000
-                            print(f"[{i}]: sleeping: ", sleep_time, "s")
-                            await asyncio.sleep(sleep_time)
-                        tasks.append(self._fetch_page(client, page_num))
-
-                    print(f"Fetching remaining {len(tasks)} pages concurrently...")
-                    other_pages_results = await asyncio.gather(*tasks)
-                    for page_data in other_pages_results:
-                        if page_data and page_data.get("items"):
-                            all_jobs.extend(page_data.get("items"))
-        return all_jobs
+        workplace_zip = item.get("workplaceZip") or ""
+        if workplace_zip == company.get("zip"):
+            address = " ".join([company.get("street") or "", company.get("houseNumber") or ""]).strip()
+            country = company.get("country") or ""
+        else:
+            address = ""
+            country_codes = item.get("countryCode")
+            if country_codes:
+                country = country_codes[0]
+            else:
+                country = ""
+            if country and country.lower() not in ["ch", "schweiz", "suisse", "svizzera"]:
+                return None
+
+        return {
+            "company_name": company_name,
+            "title": title,
+            "description": item.get("activity") or "",
+            "zip": workplace_zip,
+            "city": item.get("workplaceCity") or "",
+            "address": address,
+            "country": country,
+            "raw_data": item,
+            "first_published_at": item.get("firstPublishedAt"),
+            "url_application": item.get("urlApplication") or "",
+            "url_description": item.get("urlDescription") or "",
+        }
+
+    async def pages(self) -> AsyncIterator[list[dict]]:
+        async with httpx.AsyncClient(verify=False, transport=self.transport) as client:
+            paginator = self._paginator(client)
+            resp = await paginator.get(1)
+            items = resp.get("items") or []
+            yield items
+            total_pages = resp.get("pages") or 1
+            remaining = range(2, total_pages + 1)
+            if self.since is not None:
+                # incremental run: fetch in order, a window of pages at a time, until we get to the items we already
+                # know. That only works if the API really returns the items newest first, otherwise all pages are read
+                order = _PublicationOrder(self.since)
+                order.add(items)
+                while remaining and order.newest_first and not order.reached_since():
+                    window, remaining = remaining[: self.concurrency], remaining[self.concurrency :]
+                    for page_data in await paginator.get_many(window):
+                        items = page_data.get("items") or []
+                        yield items
+                        order.add(items)
+                if order.reached_since():
+                    print(f"Reached items published before {self.since}, skipping {len(remaining)} pages")
+                    return
+                if remaining:
+                    print("The items are not ordered by publication date, fetching all pages")
+
+            if not remaining:
+                return
+            print(f"Fetching remaining {len(remaining)} pages...")
+            async for page_data in paginator.iter_pages(remaining):
+                yield page_data.get("items") or []
+
+
+class _PublicationOrder:
+    """Follows the publication dates of the items of an incremental run, in the order they were received."""
+
+    def __init__(self, since: datetime):
+        self.since = since
+        self.newest_first = True
+        self.last: datetime | None = None
+
+    def add(self, items: list[dict]):
+        for item in items:
+            published_at = parse_datetime(item.get("firstPublishedAt") or "")
+            if published_at is None:
+                continue
+            if timezone.is_naive(published_at):
+                published_at = timezone.make_aware(published_at)
+            if self.last is not None and published_at > self.last:
+                self.newest_first = False
+            self.last = published_at
+
+    def reached_since(self) -> bool:
+        """Whether the items so far were newest first and went back to before `since`, so no later page is new."""
+        return self.newest_first and self.last is not None and self.last < self.since
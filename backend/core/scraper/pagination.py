@@ -0,0 +1,105 @@
+"""
+Rate-limited, bounded-concurrency fetching of paginated search results.
+
+`Paginator` wraps a coroutine that fetches a single page. At most ``concurrency`` pages are in flight at any time and
+requests are started at no more than ``requests_per_second`` (token bucket). Failed pages are retried with exponential
+backoff, a page that still fails afterwards raises `PageFetchError` instead of being dropped silently.
+"""
+
+import asyncio
+import random
+import time
+from collections.abc import AsyncIterator, Awaitable, Callable, Iterable
+
+import httpx
+
+
+class PageFetchError(Exception):
+    def __init__(self, page: int, cause: Exception):
+        super().__init__(f"Fetching page {page} failed: {cause}")
+        self.page = page
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+def is_retryable(error: Exception) -> bool:
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code == 429 or error.response.status_code >= 500
+    return isinstance(error, httpx.TransportError)
+
+
+class Paginator:
+    def __init__(
+        self,
+        fetch_page: Callable[[int], Awaitable[dict]],
+        *,
+        concurrency: int = 3,
+        requests_per_second: float = 5.0,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+    ):
+        self.fetch_page = fetch_page
+        self.concurrency = concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._bucket = TokenBucket(requests_per_second, capacity=concurrency)
+
+    async def get(self, page: int) -> dict:
+        attempt = 0
+        while True:
+            async with self._semaphore:
+                await self._bucket.acquire()
+                try:
+                    return await self.fetch_page(page)
+                except Exception as e:
+                    if attempt >= self.max_retries or not is_retryable(e):
+                        raise PageFetchError(page, e) from e
+                    error = e
+            # back off outside the semaphore, so the other pages aren't held up
+            delay = self.backoff * 2**attempt * random.uniform(0.5, 1.5)
+            print(f"Fetching page {page} failed ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def get_many(self, pages: Iterable[int]) -> list[dict]:
+        """Fetches the given pages and returns them in the same order."""
+        return await asyncio.gather(*map(self.get, pages))
+
+    async def iter_pages(self, pages: Iterable[int]) -> AsyncIterator[dict]:
+        """
+        Yields the given pages as soon as they arrive, not necessarily in order.
+
+        Only twice as many pages as can be fetched concurrently are requested ahead of the consumer, so a slow consumer
+        throttles the fetching instead of piling up pages in memory.
+        """
+        pages = iter(pages)
+        pending = {asyncio.ensure_future(self.get(page)) for _, page in zip(range(self.concurrency * 2), pages)}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+                    if (page := next(pages, None)) is not None:
+                        pending.add(asyncio.ensure_future(self.get(page)))
+        finally:
+            for future in pending:
+                future.cancel()
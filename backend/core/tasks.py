@@ -1,14 +1,29 @@
 import importlib
 
-from django_tasks import task
+from django.conf import settings
+from django.utils import timezone
+from django_tasks import Task, task
 
-from .models import JobOpening
+from . import upstream
+from .archive import archive_stale_openings
+from .geocoding import GeocodingWorker, Progress
+from .ingest import ingest_scraper, is_full_run_due
+from .models import Hub, ScraperState
+from .travel_times import precompute
 import traceback
-import json
 
 
-@task
-async def run_scraper_task(scraper_name: str, search_query: list[str]):
+def scheduled_retry(task: Task, attempt: int) -> Task | None:
+    """Returns the task scheduled for its next attempt, with exponential backoff, or None if it ran out of attempts."""
+    if attempt >= settings.TASK_MAX_ATTEMPTS:
+        return None
+    run_after = timezone.now() + settings.TASK_RETRY_DELAY * 2 ** (attempt - 1)
+    print(f"Attempt {attempt} of {task.name} failed, retrying after {run_after}")
+    return task.using(run_after=run_after)
+
+
+@task(queue_name="scraper")
+async def run_scraper_task(scraper_name: str, search_query: list[str], full: bool = False, attempt: int = 1):
     print("running scraper: ", scraper_name)
     try:
         try:
@@ -21,59 +36,70 @@ async def run_scraper_task(scraper_name: str, search_query: list[str]):
             traceback.print_exc()
             raise
         print("Imported: ", scraper_name)
-        scraper = scraper_class(query=search_query)
-
-        scraped_jobs = await scraper.scrape()
-
-        for job_data in scraped_jobs:
-            print("got job: ", json.dumps(job_data, indent=4))
-            # uniqueness_hash = create_job_fingerprint(
-            #     company_name=job_data["company_name"], title=job_data["title"], description=job_data["description"]
-            # )
-
-            company = job_data["company"]
-            title = job_data["title"]
-
-            workplace_zip = job_data.get("workplaceZip")
-            if workplace_zip == company.get("zip"):
-                address = " ".join([company.get("street", ""), company.get("houseNumber", "")]).strip()
-                country = company.get("country")
-            else:
-                address = ""
-                country_codes = job_data.get("countryCode")
-                if country_codes:
-                    country = country_codes[0]
-                else:
-                    country = ""
-                if country and country.lower() not in ["ch", "schweiz", "suisse", "svizzera"]:
-                    continue
-
-            # Get or create the canonical JobOpening
-            opening, created = await JobOpening.objects.aget_or_create(
-                company_name=company.get("name"),
-                title=title,
-                defaults={
-                    "company_name": company.get("name"),
-                    "title": title,
-                    "description": job_data.get("activity"),
-                    # Add the new fields to the defaults
-                    "zip": job_data.get("workplaceZip"),
-                    "city": job_data.get("workplaceCity"),
-                    "address": address,
-                    "country": country,
-                    "raw_data": job_data,
-                    "first_published_at": job_data.get("firstPublishedAt"),
-                    "url_application": job_data.get("urlApplication", ""),
-                    "url_description": job_data.get("urlDescription", ""),
-                },
-            )
-
-            # Add the URL and save (this logic remains the same)
-            new_url = job_data.get("url")
-            if new_url and new_url not in opening.urls:
-                opening.urls.append(new_url)
-
-            await opening.asave()
-    except:
+        state, _ = await ScraperState.objects.aget_or_create(
+            scraper=scraper_name, query=" | ".join(sorted(search_query))
+        )
+        full = full or is_full_run_due(state)
+        print("Full run" if full else f"Incremental run, since: {state.watermark}")
+
+        scraper = scraper_class(
+            query=search_query, since=None if full else state.watermark, **settings.SCRAPERS.get(scraper_name, {})
+        )
+        stats = await ingest_scraper(scraper, state)
+
+        state.last_run_at = timezone.now()
+        if full:
+            state.last_full_run_at = state.last_run_at
+        await state.asave()
+        print(
+            f"Scraped {stats.scraped} jobs, upserted {stats.written} openings, {stats.unchanged} unchanged, "
+            f"{stats.duplicates} duplicates, {stats.geocoded} geocoded"
+        )
+    except ModuleNotFoundError:
+        raise
+    except Exception:
+        traceback.print_exc()
+        if retry := scheduled_retry(run_scraper_task, attempt):
+            await retry.aenqueue(scraper_name=scraper_name, search_query=search_query, full=full, attempt=attempt + 1)
+        raise
+    finally:
+        # async tasks run through async_to_sync, on a new event loop every time
+        await upstream.close_clients()
+
+    await geocode_task.aenqueue()
+    if full:
+        await archive_openings_task.aenqueue()
+
+
+@task(queue_name="geocode")
+def geocode_task(batch_size: int = 50, concurrency: int = 8, attempt: int = 1):
+    try:
+        GeocodingWorker(batch_size=batch_size, concurrency=concurrency, progress=Progress()).run()
+    except Exception:
         traceback.print_exc()
+        if retry := scheduled_retry(geocode_task, attempt):
+            retry.enqueue(batch_size=batch_size, concurrency=concurrency, attempt=attempt + 1)
         raise
+
+    precompute_travel_times_task.enqueue()
+
+
+@task
+async def precompute_travel_times_task(attempt: int = 1):
+    try:
+        async for hub in Hub.objects.all():
+            for profile in settings.TRAVEL_TIME_PROFILES:
+                await precompute(hub, profile)
+    except Exception:
+        traceback.print_exc()
+        if retry := scheduled_retry(precompute_travel_times_task, attempt):
+            await retry.aenqueue(attempt=attempt + 1)
+        raise
+    finally:
+        await upstream.close_clients()
+
+
+@task
+async def archive_openings_task():
+    archived = await archive_stale_openings()
+    print(f"Archived {archived} stale openings")
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from core.archive import stale_cutoff
+from core.models import ScraperState
+
+SCRAPERS = {"core.scraper.ostjob_scraper.OstjobScraper": {}, "core.scraper.other.OtherScraper": {}}
+
+
+class AsyncList(list):
+    async def __aiter__(self):
+        for item in self:
+            yield item
+
+
+@override_settings(SCRAPERS=SCRAPERS, ARCHIVE_AFTER_FULL_RUNS=2, SCRAPER_FULL_RUN_INTERVAL=timedelta(days=7))
+class StaleCutoffTests(SimpleTestCase):
+    async def cutoff(self, latest_runs: dict[str, datetime | None]):
+        """The cutoff, with `latest_runs` as the latest full run of every scraper that has a state."""
+        queryset = mock.Mock()
+        queryset.values.return_value.annotate.return_value = AsyncList(
+            {"scraper": scraper, "latest": latest} for scraper, latest in latest_runs.items()
+        )
+        with mock.patch.object(ScraperState.objects, "filter", return_value=queryset) as filter_states:
+            cutoff = await stale_cutoff()
+        filter_states.assert_called_once_with(scraper__in=SCRAPERS)
+        return cutoff
+
+    async def test_two_intervals_before_the_oldest_latest_full_run(self):
+        cutoff = await self.cutoff(
+            {
+                "core.scraper.ostjob_scraper.OstjobScraper": datetime(2026, 10, 10, tzinfo=timezone.utc),
+                "core.scraper.other.OtherScraper": datetime(2026, 10, 15, tzinfo=timezone.utc),
+            }
+        )
+        self.assertEqual(cutoff, datetime(2026, 9, 26, tzinfo=timezone.utc))
+
+    async def test_none_until_every_scraper_completed_a_full_run(self):
+        ostjob = {"core.scraper.ostjob_scraper.OstjobScraper": datetime(2026, 10, 10, tzinfo=timezone.utc)}
+        self.assertIsNone(await self.cutoff(ostjob))
+        self.assertIsNone(await self.cutoff(ostjob | {"core.scraper.other.OtherScraper": None}))
@@ -0,0 +1,76 @@
+import asyncio
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.cache import LRUCache, SingleFlight
+
+
+class LRUCacheTests(SimpleTestCase):
+    def test_evicts_least_recently_used_entries_over_max_bytes(self):
+        cache = LRUCache(max_bytes=10)
+        cache.set("a", 1, size=4)
+        cache.set("b", 2, size=4)
+        cache.get("a")
+        cache.set("c", 3, size=4)
+        self.assertEqual((cache.get("a"), cache.get("b"), cache.get("c")), (1, None, 3))
+        self.assertEqual(cache.current_bytes, 8)
+
+    def test_replacing_an_entry_updates_the_size(self):
+        cache = LRUCache(max_bytes=10)
+        cache.set("a", 1, size=4)
+        cache.set("a", 2, size=6)
+        self.assertEqual((cache.get("a"), cache.current_bytes), (2, 6))
+
+    def test_values_larger_than_the_cache_are_not_stored(self):
+        cache = LRUCache(max_bytes=10)
+        cache.set("a", 1, size=11)
+        self.assertEqual((len(cache), cache.current_bytes), (0, 0))
+
+    def test_entries_expire_after_ttl(self):
+        cache = LRUCache(max_bytes=10, ttl=60)
+        with mock.patch("core.cache.time") as clock:
+            clock.monotonic.return_value = 1_000
+            cache.set("a", 1, size=4)
+            clock.monotonic.return_value = 1_060
+            self.assertEqual(cache.get("a"), 1)
+            clock.monotonic.return_value = 1_061
+            self.assertIsNone(cache.get("a"))
+        self.assertEqual(cache.current_bytes, 0)
+
+
+class SingleFlightTests(SimpleTestCase):
+    async def test_concurrent_calls_share_one_fetch(self):
+        single_flight = SingleFlight()
+        calls = []
+
+        async def fetch():
+            calls.append(None)
+            await asyncio.sleep(0.01)
+            return "result"
+
+        results = await asyncio.gather(*(single_flight.run("key", fetch) for _ in range(3)))
+        self.assertEqual(results, ["result"] * 3)
+        self.assertEqual(len(calls), 1)
+
+    async def test_later_calls_fetch_again(self):
+        single_flight = SingleFlight()
+        fetch = mock.AsyncMock(return_value="result")
+        await single_flight.run("key", fetch)
+        await single_flight.run("key", fetch)
+        self.assertEqual(fetch.await_count, 2)
+
+    async def test_a_cancelled_caller_does_not_cancel_the_others(self):
+        single_flight = SingleFlight()
+        started = asyncio.Event()
+
+        async def fetch():
+            started.set()
+            await asyncio.sleep(0.01)
+            return "result"
+
+        first = asyncio.create_task(single_flight.run("key", fetch))
+        second = asyncio.create_task(single_flight.run("key", fetch))
+        await started.wait()
+        first.cancel()
+        self.assertEqual(await second, "result")
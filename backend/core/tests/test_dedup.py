@@ -0,0 +1,49 @@
+from django.test import SimpleTestCase
+
+from core.dedup import band_hashes, fingerprint, minhash, normalize_text, similarity, title_similarity
+
+DESCRIPTION = (
+    "Wir suchen eine erfahrene Softwareentwicklerin für unser Team in St. Gallen. Du entwickelst Webanwendungen mit "
+    "Python und Django, arbeitest eng mit unseren Kunden zusammen und übernimmst Verantwortung für den Betrieb."
+)
+
+
+class DedupTests(SimpleTestCase):
+    def test_normalize_text(self):
+        self.assertEqual(normalize_text("  Zürich, Gümligen!  Café "), "zurich gumligen cafe")
+
+    def test_fingerprint_ignores_formatting(self):
+        self.assertEqual(
+            fingerprint("Software Engineer", "Example AG", DESCRIPTION, "9000", "St. Gallen"),
+            fingerprint("software  engineer", "EXAMPLE AG", DESCRIPTION.upper(), "9000", "St.Gallen"),
+        )
+
+    def test_fingerprint_differs_per_branch(self):
+        self.assertNotEqual(
+            fingerprint("Software Engineer", "Example AG", DESCRIPTION, "9000", "St. Gallen"),
+            fingerprint("Software Engineer", "Example AG", DESCRIPTION, "8000", "Zürich"),
+        )
+
+    def test_similarity_of_reposts(self):
+        repost = minhash(DESCRIPTION.replace("St. Gallen", "St. Gallen (Teilzeit möglich)"))
+        self.assertGreater(similarity(minhash(DESCRIPTION), repost), 0.6)
+        self.assertEqual(similarity(minhash(DESCRIPTION), minhash(DESCRIPTION)), 1.0)
+
+    def test_similarity_of_unrelated_text(self):
+        other = "Als Pflegefachperson betreust du unsere Bewohnerinnen und Bewohner im Alterszentrum am Bodensee."
+        self.assertLess(similarity(minhash(DESCRIPTION), minhash(other)), 0.2)
+
+    def test_similarity_of_empty_signatures(self):
+        self.assertEqual(similarity([], []), 0.0)
+
+    def test_title_similarity(self):
+        self.assertEqual(title_similarity("Software Engineer", "Software-Engineer (m/w/d)"), 1.0)
+        self.assertEqual(title_similarity("Java Developer", "Python Developer"), 0.5)
+        self.assertEqual(title_similarity("", "Developer"), 0.0)
+
+    def test_band_hashes(self):
+        signature = minhash(DESCRIPTION)
+        bands = band_hashes(signature)
+        self.assertEqual(len(bands), 16)
+        self.assertTrue(all(-(2**63) <= band < 2**63 for band in bands))
+        self.assertEqual(bands, band_hashes(list(signature)))
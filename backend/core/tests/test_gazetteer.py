@@ -0,0 +1,78 @@
+import tempfile
+from pathlib import Path
+from unittest import mock
+
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase
+
+from core.gazetteer import Gazetteer, build, fold
+from core.models import Place
+
+PLACES = [
+    Place(name="Zürich", state="Zürich", kind=Place.Kind.MUNICIPALITY, location=Point(8.5417, 47.3769, srid=4326)),
+    Place(name="Zuzwil", state="St. Gallen", kind=Place.Kind.MUNICIPALITY, location=Point(9.1117, 47.4737, srid=4326)),
+    Place(name="Zuzwil", state="Bern/Berne", kind=Place.Kind.LOCALITY, location=Point(7.4722, 47.0506, srid=4326)),
+    Place(name="Zug", state="Zug", kind=Place.Kind.MUNICIPALITY, location=Point(8.5158, 47.1662, srid=4326)),
+    Place(name="Bern", state="Bern/Berne", kind=Place.Kind.MUNICIPALITY, location=Point(7.4474, 46.9480, srid=4326)),
+    Place(
+        name="Bernhardzell", state="St. Gallen", kind=Place.Kind.LOCALITY, location=Point(9.3372, 47.4756, srid=4326)
+    ),
+]
+
+ST_GALLEN = {"lat": 47.4245, "lon": 9.3767}
+
+
+class GazetteerTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.directory = tempfile.TemporaryDirectory()
+        path = Path(cls.directory.name) / "gazetteer.bin"
+        build(PLACES, path)
+        cls.gazetteer = Gazetteer(path)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.gazetteer.close()
+        cls.directory.cleanup()
+        super().tearDownClass()
+
+    def names(self, query: str, limit: int = 5, near=ST_GALLEN) -> list[tuple[str, str]]:
+        features = self.gazetteer.search(query, limit=limit, **near)
+        return [(f["properties"]["name"], f["properties"]["state"]) for f in features]
+
+    def test_fold(self):
+        self.assertEqual(fold("  Zürich "), "zurich")
+
+    def test_prefix_search(self):
+        self.assertCountEqual(
+            self.names("zu"), [("Zürich", "Zürich"), ("Zuzwil", "St. Gallen"), ("Zuzwil", "Bern/Berne"), ("Zug", "Zug")]
+        )
+
+    def test_spelled_out_umlauts(self):
+        self.assertEqual(self.names("zuer"), [("Zürich", "Zürich")])
+
+    def test_exact_match_first(self):
+        self.assertEqual(self.names("bern")[0], ("Bern", "Bern/Berne"))
+
+    def test_municipalities_before_localities(self):
+        # from Bern, where the locality Zuzwil BE is the nearer one
+        self.assertEqual(self.names("zuzwil", near={"lat": 46.948, "lon": 7.4474})[0], ("Zuzwil", "St. Gallen"))
+
+    def test_nearer_places_first(self):
+        self.assertEqual(self.names("z", limit=2), [("Zuzwil", "St. Gallen"), ("Zürich", "Zürich")])
+
+    def test_limit_and_no_match(self):
+        self.assertEqual(len(self.names("z", limit=1)), 1)
+        self.assertEqual(self.names("genf"), [])
+        self.assertEqual(self.names("  "), [])
+
+    def test_too_many_matches(self):
+        with mock.patch("core.gazetteer.MAX_CANDIDATES", 3):
+            self.assertIsNone(self.gazetteer.search("z", limit=5, **ST_GALLEN))
+            self.assertEqual(len(self.names("zuz")), 2)
+
+    def test_photon_feature_format(self):
+        (feature,) = self.gazetteer.search("zug", limit=1, **ST_GALLEN)
+        self.assertEqual(feature["geometry"], {"type": "Point", "coordinates": [8.5158, 47.1662]})
+        self.assertEqual(feature["properties"]["type"], "city")
@@ -0,0 +1,35 @@
+from datetime import timedelta
+
+from django.contrib.gis.geos import Point
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+
+from core.geocoding import GeocodeResult, address_of, apply_results, retry_delay
+from core.models import JobOpening
+
+
+@override_settings(GEOCODING={"RETRY_BASE_DELAY": timedelta(hours=1), "RETRY_MAX_DELAY": timedelta(days=1)})
+class GeocodingTests(SimpleTestCase):
+    def test_retry_delay_doubles_up_to_the_maximum(self):
+        self.assertEqual([retry_delay(attempts) for attempts in (1, 2, 3)], [timedelta(hours=h) for h in (1, 2, 4)])
+        self.assertEqual(retry_delay(6), timedelta(days=1))
+
+    def test_apply_results(self):
+        found = JobOpening(company_name="Example AG", address="Teststrasse 1", zip="9000", city="St. Gallen")
+        not_found = JobOpening(company_name="Example AG", address="", zip="0000", city="Nirgendwo", geocode_attempts=2)
+        location = Point(9.3767, 47.4245, srid=4326)
+        results = {address_of(found): GeocodeResult(location, 1.0), address_of(not_found): GeocodeResult(None, 0)}
+
+        before = timezone.now()
+        self.assertEqual(apply_results([found, not_found], results), 1)
+
+        self.assertEqual(found.location, location)
+        self.assertEqual(found.geocode_status, JobOpening.GeocodeStatus.FOUND)
+        self.assertEqual(found.geocode_attempts, 1)
+        self.assertIsNone(found.geocode_due_at)
+        self.assertGreaterEqual(found.geocode_attempted_at, before)
+
+        self.assertIsNone(not_found.location)
+        self.assertEqual(not_found.geocode_status, JobOpening.GeocodeStatus.NOT_FOUND)
+        self.assertEqual(not_found.geocode_attempts, 3)
+        self.assertEqual(not_found.geocode_due_at, not_found.geocode_attempted_at + timedelta(hours=4))
@@ -0,0 +1,37 @@
+from django.test import SimpleTestCase
+
+from core.geometry import encode_polyline
+
+
+def decode_polyline(encoded: str, precision: int) -> list[tuple[float, float]]:
+    values, value, shift = [], 0, 0
+    for char in encoded:
+        chunk = ord(char) - 63
+        value |= (chunk & 0x1F) << shift
+        shift += 5
+        if chunk < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value, shift = 0, 0
+    lat = lon = 0
+    ring = []
+    for lat_delta, lon_delta in zip(values[::2], values[1::2]):
+        lat, lon = lat + lat_delta, lon + lon_delta
+        ring.append((round(lon / 10**precision, precision), round(lat / 10**precision, precision)))
+    return ring
+
+
+class EncodePolylineTests(SimpleTestCase):
+    def test_reference_example(self):
+        # the example of Google's polyline algorithm documentation, rings are (lon, lat)
+        ring = [(-120.2, 38.5), (-120.95, 40.7), (-126.453, 43.252)]
+        self.assertEqual(encode_polyline(ring), "_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+
+    def test_round_trip(self):
+        ring = [(8.541694, 47.376887), (8.541701, 47.376887), (9.376717, 47.424482), (8.541694, 47.376887)]
+        for precision in (5, 6):
+            decoded = decode_polyline(encode_polyline(ring, precision), precision)
+            expected = [(round(lon, precision), round(lat, precision)) for lon, lat in ring]
+            self.assertEqual(decoded, expected)
+
+    def test_empty_ring(self):
+        self.assertEqual(encode_polyline([]), "")
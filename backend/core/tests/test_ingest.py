@@ -0,0 +1,147 @@
+from unittest import mock
+
+from django.test import SimpleTestCase
+
+from core.dedup import band_hashes, fingerprint, minhash, opening_text
+from core.ingest import IngestStats, content_hash, ingest_rows
+from core.models import JobOpening
+
+DESCRIPTION = (
+    "Wir suchen eine erfahrene Softwareentwicklerin oder einen erfahrenen Softwareentwickler für unser Team in "
+    "St. Gallen. Du entwickelst Webanwendungen mit Python und Django, arbeitest eng mit unseren Kunden zusammen, "
+    "planst neue Funktionen gemeinsam mit dem Produktteam, schreibst Tests und Dokumentation und übernimmst "
+    "Verantwortung für den Betrieb unserer Plattform. Wir bieten flexible Arbeitszeiten, Weiterbildung und ein "
+    "modernes Büro in der Nähe des Bahnhofs."
+)
+
+
+def row(title: str, zip: str = "9000", city: str = "St. Gallen", description: str = DESCRIPTION, **raw) -> dict:
+    return {
+        "company_name": "Example AG",
+        "title": title,
+        "description": description,
+        "zip": zip,
+        "city": city,
+        "address": "",
+        "country": "CH",
+        "raw_data": {"title": title, **raw},
+        "first_published_at": None,
+        "url_application": "",
+        "url_description": "",
+    }
+
+
+class AsyncList(list):
+    async def __aiter__(self):
+        for item in self:
+            yield item
+
+
+def existing(id: int, r: dict, *, changed: bool = False) -> JobOpening:
+    """The stored opening of a row, as loaded by find_known_openings and find_near_duplicates."""
+    signature = minhash(opening_text(r))
+    return JobOpening(
+        id=id,
+        company_name=r["company_name"],
+        title=r["title"],
+        zip=r["zip"],
+        city=r["city"],
+        fingerprint=fingerprint(r["title"], r["company_name"], r["description"], r["zip"], r["city"]),
+        content_hash="outdated" if changed else content_hash(r),
+        minhash=signature,
+        minhash_bands=band_hashes(signature),
+    )
+
+
+class IngestRowsTests(SimpleTestCase):
+    """The classification of scraped rows into unchanged, changed, duplicate and new ones, without a database."""
+
+    async def ingest(self, rows: list[dict], known: list[JobOpening], candidates: list[JobOpening] = ()):
+        async def upsert(rows):
+            return [JobOpening(title=r["title"], zip=r["zip"]) for r in rows]
+
+        def filter_openings(**lookups):
+            queryset = mock.Mock()
+            queryset.only.return_value = AsyncList(candidates)
+            queryset.aupdate = mock.AsyncMock()
+            self.updates.append((lookups, queryset.aupdate))
+            return queryset
+
+        self.updates = []
+        self.upserted = []
+        stats = IngestStats()
+        with (
+            mock.patch("core.ingest.find_known_openings", mock.AsyncMock(return_value=known)),
+            mock.patch("core.ingest.upsert_openings", mock.AsyncMock(side_effect=upsert)) as upsert_openings,
+            mock.patch.object(JobOpening.objects, "filter", side_effect=filter_openings),
+        ):
+            new = await ingest_rows(rows, None, stats)
+        self.upserted = [r["title"] for r in upsert_openings.call_args.args[0]] if upsert_openings.called else []
+        return new, stats
+
+    def seen_ids(self) -> list[int]:
+        return [id for lookups, aupdate in self.updates if aupdate.called for id in lookups["id__in"]]
+
+    async def test_unchanged_openings_are_only_marked_seen(self):
+        r = row("Software Engineer")
+        new, stats = await self.ingest([r], known=[existing(1, r)])
+        self.assertEqual(new, [])
+        self.assertEqual(self.upserted, [])
+        self.assertEqual(self.seen_ids(), [1])
+        self.assertEqual((stats.written, stats.unchanged, stats.duplicates), (0, 1, 0))
+
+    async def test_changed_openings_are_written(self):
+        r = row("Software Engineer")
+        new, stats = await self.ingest([r], known=[existing(1, r, changed=True)])
+        self.assertEqual(new, [])
+        self.assertEqual(self.upserted, ["Software Engineer"])
+        self.assertEqual((stats.written, stats.unchanged), (1, 0))
+
+    async def test_exact_duplicates_collapse_into_the_known_opening(self):
+        known = row("Software Engineer")
+        # the same job under another title, e.g. from another platform: same fingerprint, other unique key
+        repost = dict(known, raw_data={"source": "elsewhere"})
+        known_opening = existing(1, known)
+        known_opening.title = "Software Engineer (m/w/d)"
+        new, stats = await self.ingest([repost], known=[known_opening])
+        self.assertEqual(self.upserted, [])
+        self.assertEqual(self.seen_ids(), [1])
+        self.assertEqual(stats.duplicates, 1)
+
+    async def test_near_duplicates_collapse_into_the_known_opening(self):
+        known = row("Software Engineer")
+        repost = row("Software Engineer (m/w/d)", description=DESCRIPTION + " Teilzeit ist möglich.")
+        new, stats = await self.ingest([repost], known=[], candidates=[existing(1, known)])
+        self.assertEqual(new, [])
+        self.assertEqual(self.seen_ids(), [1])
+        self.assertEqual(stats.duplicates, 1)
+
+    async def test_other_positions_from_the_same_template_are_new(self):
+        known = row("Java Developer")
+        other = row("Python Developer")
+        new, stats = await self.ingest([other], known=[], candidates=[existing(1, known)])
+        self.assertEqual([opening.title for opening in new], ["Python Developer"])
+        self.assertEqual(stats.duplicates, 0)
+
+    async def test_near_duplicates_within_a_batch_are_written_once(self):
+        first = row("Software Engineer")
+        repost = row("Software Engineer (m/w/d)", description=DESCRIPTION + " Teilzeit ist möglich.")
+        other = row("Python Developer")
+        new, stats = await self.ingest([first, repost, other], known=[])
+        self.assertEqual(self.upserted, ["Software Engineer", "Python Developer"])
+        self.assertEqual(stats.duplicates, 1)
+
+    async def test_the_same_job_at_another_branch_is_new(self):
+        known = row("Software Engineer")
+        branch = row("Software Engineer", zip="8000", city="Zürich")
+        new, stats = await self.ingest([branch], known=[], candidates=[existing(1, known)])
+        self.assertEqual([(opening.title, opening.zip) for opening in new], [("Software Engineer", "8000")])
+        self.assertEqual(stats.duplicates, 0)
+
+    async def test_new_openings_are_returned(self):
+        known = row("Software Engineer")
+        other = row("Data Scientist", description="Du baust Modelle für die Prognose unserer Energieproduktion.")
+        new, stats = await self.ingest([known, other], known=[existing(1, known, changed=True)])
+        self.assertEqual(self.upserted, ["Software Engineer", "Data Scientist"])
+        self.assertEqual([opening.title for opening in new], ["Data Scientist"])
+        self.assertEqual(stats.written, 2)
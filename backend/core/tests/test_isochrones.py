@@ -0,0 +1,33 @@
+from django.test import SimpleTestCase
+
+from core.isochrones import bucket_travel_time, snap_to_grid
+from core.travel_times import distance_meters
+
+
+class SnapToGridTests(SimpleTestCase):
+    def test_nearby_origins_share_a_cell(self):
+        self.assertEqual(snap_to_grid(47.42451, 9.37671, 250), snap_to_grid(47.42452, 9.37672, 250))
+
+    def test_snapped_origin_stays_within_the_cell(self):
+        lat, lon = 47.42451, 9.37671
+        self.assertLess(distance_meters(lat, lon, *snap_to_grid(lat, lon, 250)), 250)
+
+    def test_cells_are_about_grid_meters_wide(self):
+        # 0.005 degrees of latitude are about 557 m, so the origins are two or three cells apart
+        a, b = snap_to_grid(47.42, 9.37, 250), snap_to_grid(47.425, 9.37, 250)
+        self.assertAlmostEqual(distance_meters(*a, *b) / 250, 2, delta=1)
+
+    def test_no_grid(self):
+        self.assertEqual(snap_to_grid(47.424513, 9.376712, 0), (47.424513, 9.376712))
+
+
+class BucketTravelTimeTests(SimpleTestCase):
+    def test_rounds_to_the_nearest_bucket(self):
+        self.assertEqual(bucket_travel_time(1_229, 60), 1_200)
+        self.assertEqual(bucket_travel_time(1_231, 60), 1_260)
+
+    def test_at_least_one_bucket(self):
+        self.assertEqual(bucket_travel_time(10, 60), 60)
+
+    def test_no_buckets(self):
+        self.assertEqual(bucket_travel_time(1_231, 1), 1_231)
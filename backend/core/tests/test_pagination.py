@@ -0,0 +1,160 @@
+import asyncio
+from datetime import datetime, timezone
+
+import httpx
+from django.test import SimpleTestCase
+
+from core.scraper.ostjob_scraper import OstjobScraper
+from core.scraper.pagination import PageFetchError, Paginator
+
+
+def fake_api(handler) -> httpx.AsyncClient:
+    return httpx.AsyncClient(base_url="http://ostjob.test", transport=httpx.MockTransport(handler))
+
+
+def page_fetcher(client: httpx.AsyncClient):
+    async def fetch_page(page: int) -> dict:
+        response = await client.get("/search", params={"page": page})
+        response.raise_for_status()
+        return response.json()
+
+    return fetch_page
+
+
+def paginator(client: httpx.AsyncClient, **kwargs) -> Paginator:
+    kwargs = {"requests_per_second": 1000, "backoff": 0, **kwargs}
+    return Paginator(page_fetcher(client), **kwargs)
+
+
+class PaginatorTests(SimpleTestCase):
+    async def test_retries_server_errors(self):
+        attempts = []
+
+        def handler(request):
+            attempts.append(request)
+            if len(attempts) < 3:
+                return httpx.Response(503)
+            return httpx.Response(200, json={"page": int(request.url.params["page"])})
+
+        async with fake_api(handler) as client:
+            self.assertEqual(await paginator(client, max_retries=3).get(1), {"page": 1})
+        self.assertEqual(len(attempts), 3)
+
+    async def test_raises_when_retries_are_exhausted(self):
+        attempts = []
+
+        def handler(request):
+            attempts.append(request)
+            return httpx.Response(429)
+
+        async with fake_api(handler) as client:
+            with self.assertRaises(PageFetchError) as raised:
+                await paginator(client, max_retries=2).get(4)
+        self.assertEqual(raised.exception.page, 4)
+        self.assertEqual(len(attempts), 3)
+
+    async def test_does_not_retry_client_errors(self):
+        attempts = []
+
+        def handler(request):
+            attempts.append(request)
+            return httpx.Response(404)
+
+        async with fake_api(handler) as client:
+            with self.assertRaises(PageFetchError):
+                await paginator(client).get(1)
+        self.assertEqual(len(attempts), 1)
+
+    async def test_caps_concurrent_requests(self):
+        in_flight = max_in_flight = 0
+
+        async def handler(request):
+            nonlocal in_flight, max_in_flight
+            in_flight += 1
+            max_in_flight = max(max_in_flight, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return httpx.Response(200, json={"page": int(request.url.params["page"])})
+
+        async with fake_api(handler) as client:
+            pages = await paginator(client, concurrency=2).get_many(range(1, 9))
+        self.assertEqual([page["page"] for page in pages], list(range(1, 9)))
+        self.assertEqual(max_in_flight, 2)
+
+    async def test_iter_pages_yields_every_page(self):
+        def handler(request):
+            return httpx.Response(200, json={"page": int(request.url.params["page"])})
+
+        async with fake_api(handler) as client:
+            pages = [page async for page in paginator(client, concurrency=2).iter_pages(range(1, 11))]
+        self.assertCountEqual([page["page"] for page in pages], range(1, 11))
+
+
+def ostjob_item(i: int, published: str) -> dict:
+    # synthetic, with only the keys OstjobScraper.normalize reads
+    return {
+        "id": i,
+        "title": f"Software Engineer {i}",
+        "company": {"name": "Example AG", "zip": "9000", "street": "Teststrasse", "houseNumber": "1"},
+        "workplaceZip": "9000",
+        "workplaceCity": "St. Gallen",
+        "activity": "Python und Django",
+        "firstPublishedAt": published,
+        "urlApplication": "",
+        "urlDescription": "",
+    }
+
+
+class FakeOstjob:
+    """Serves `items` in the given order, `page_size` per page. Like the search endpoint, but `order` is ignored."""
+
+    def __init__(self, items: list[dict], page_size: int):
+        self.items = items
+        self.page_size = page_size
+        self.requested_pages = []
+
+    def __call__(self, request: httpx.Request) -> httpx.Response:
+        page = int(request.url.params["page"])
+        self.requested_pages.append(page)
+        start = (page - 1) * self.page_size
+        pages = -(-len(self.items) // self.page_size)
+        return httpx.Response(200, json={"items": self.items[start : start + self.page_size], "pages": pages})
+
+
+class OstjobScraperTests(SimpleTestCase):
+    def setUp(self):
+        # item i was published on day 30 - i, newest first
+        self.items = [ostjob_item(i, f"2026-09-{30 - i:02d}T08:00:00Z") for i in range(25)]
+        self.api = FakeOstjob(self.items, page_size=10)
+
+    def scraper(self, since=None, **kwargs) -> OstjobScraper:
+        return OstjobScraper(
+            ["python"], since, page_size=10, requests_per_second=1000, transport=httpx.MockTransport(self.api), **kwargs
+        )
+
+    async def test_full_run_fetches_every_page(self):
+        items = await self.scraper().scrape()
+        self.assertCountEqual([item["id"] for item in items], range(25))
+        self.assertCountEqual(self.api.requested_pages, [1, 2, 3])
+
+    async def test_incremental_run_stops_at_known_items(self):
+        # items 0 to 11 are newer, item 12 on page 2 is the first one published before `since`
+        since = datetime(2026, 9, 18, 12, tzinfo=timezone.utc)
+        # one page at a time, so page 3 is never requested
+        items = await self.scraper(since, concurrency=1).scrape()
+        self.assertEqual([item["id"] for item in items], list(range(20)))
+        self.assertNotIn(3, self.api.requested_pages)
+
+    async def test_incremental_run_fetches_every_page_if_not_newest_first(self):
+        # oldest first: page 1 only has items published before `since`, but the newer ones follow on the later pages
+        self.api.items.reverse()
+        since = datetime(2026, 9, 18, 12, tzinfo=timezone.utc)
+        items = await self.scraper(since, concurrency=1).scrape()
+        self.assertCountEqual([item["id"] for item in items], range(25))
+        self.assertCountEqual(self.api.requested_pages, [1, 2, 3])
+
+    def test_normalize(self):
+        row = self.scraper().normalize(self.items[0])
+        self.assertEqual(row["company_name"], "Example AG")
+        self.assertEqual(row["zip"], "9000")
+        self.assertEqual(row["address"], "Teststrasse 1")
@@ -0,0 +1,35 @@
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import LRUCache
+from core.places import from_shorter_prefix
+
+
+def feature(name: str) -> dict:
+    return {"type": "Feature", "properties": {"name": name}}
+
+
+@override_settings(PLACE_SEARCH={"LIMIT": 3})
+class FromShorterPrefixTests(SimpleTestCase):
+    def setUp(self):
+        patcher = mock.patch("core.places._cache", LRUCache(max_bytes=1024))
+        self.cache = patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_filters_a_complete_result_of_a_shorter_prefix(self):
+        self.cache.set(("st", 47.42, 9.38, 10), [feature("St. Gallen"), feature("Stein AR")], size=1)
+        self.assertEqual(from_shorter_prefix("st. g", 47.42, 9.38, 10), [feature("St. Gallen")])
+
+    def test_uses_the_longest_cached_prefix(self):
+        self.cache.set(("s", 47.42, 9.38, 10), [feature("Sargans")], size=1)
+        self.cache.set(("st", 47.42, 9.38, 10), [feature("Stein AR")], size=1)
+        self.assertEqual(from_shorter_prefix("ste", 47.42, 9.38, 10), [feature("Stein AR")])
+
+    def test_ignores_results_cut_off_at_the_limit(self):
+        self.cache.set(("st", 47.42, 9.38, 10), [feature("St. Gallen"), feature("Stein AR"), feature("Sturm")], size=1)
+        self.assertIsNone(from_shorter_prefix("st. g", 47.42, 9.38, 10))
+
+    def test_other_location_bias(self):
+        self.cache.set(("st", 47.42, 9.38, 10), [feature("St. Gallen")], size=1)
+        self.assertIsNone(from_shorter_prefix("st. g", 46.95, 7.45, 10))
@@ -0,0 +1,25 @@
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from core.tasks import geocode_task, scheduled_retry
+
+NOW = datetime(2026, 10, 18, 12, tzinfo=timezone.utc)
+
+
+@override_settings(TASK_MAX_ATTEMPTS=3, TASK_RETRY_DELAY=timedelta(minutes=1))
+class ScheduledRetryTests(SimpleTestCase):
+    def retry(self, attempt: int):
+        with mock.patch("core.tasks.timezone.now", return_value=NOW), mock.patch("builtins.print"):
+            return scheduled_retry(geocode_task, attempt)
+
+    def test_backs_off_exponentially(self):
+        self.assertEqual(self.retry(1).run_after, NOW + timedelta(minutes=1))
+        self.assertEqual(self.retry(2).run_after, NOW + timedelta(minutes=2))
+
+    def test_keeps_the_queue(self):
+        self.assertEqual(self.retry(1).queue_name, "geocode")
+
+    def test_none_after_the_last_attempt(self):
+        self.assertIsNone(self.retry(3))
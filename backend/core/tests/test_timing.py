@@ -0,0 +1,46 @@
+from django.test import SimpleTestCase
+
+from core.timing import Histogram, Timings
+
+
+class TimingsTests(SimpleTestCase):
+    def test_server_timing(self):
+        timings = Timings()
+        timings.add("isochrone", 0.0123)
+        timings.add("db", 0.002)
+        timings.add("db", 0.003)
+        timings.queries = 2
+        timings.cache_lookups["isochrone"] = [1, 2]
+        self.assertEqual(
+            timings.server_timing(0.02),
+            'isochrone;dur=12.3, db;dur=5.0;desc="2 queries", cache-isochrone;desc="1 hits, 2 misses", total;dur=20.0',
+        )
+
+    def test_server_timing_without_stages(self):
+        self.assertEqual(Timings().server_timing(0.0011), "total;dur=1.1")
+
+
+class HistogramTests(SimpleTestCase):
+    def test_render(self):
+        histogram = Histogram("duration_seconds", "Duration.", ("endpoint",), (0.1, 1.0))
+        histogram.observe(0.05, "jobs")
+        histogram.observe(0.5, "jobs")
+        histogram.observe(2.0, "jobs")
+        histogram.observe(0.5, 'say "hi"')
+        self.assertEqual(
+            histogram.render(),
+            [
+                "# HELP duration_seconds Duration.",
+                "# TYPE duration_seconds histogram",
+                'duration_seconds_bucket{endpoint="jobs",le="0.1"} 1',
+                'duration_seconds_bucket{endpoint="jobs",le="1.0"} 2',
+                'duration_seconds_bucket{endpoint="jobs",le="+Inf"} 3',
+                'duration_seconds_sum{endpoint="jobs"} 2.55',
+                'duration_seconds_count{endpoint="jobs"} 3',
+                'duration_seconds_bucket{endpoint="say \\"hi\\"",le="0.1"} 0',
+                'duration_seconds_bucket{endpoint="say \\"hi\\"",le="1.0"} 1',
+                'duration_seconds_bucket{endpoint="say \\"hi\\"",le="+Inf"} 1',
+                'duration_seconds_sum{endpoint="say \\"hi\\""} 0.5',
+                'duration_seconds_count{endpoint="say \\"hi\\""} 1',
+            ],
+        )
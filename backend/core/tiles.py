@@ -0,0 +1,124 @@
+"""
+Mapbox vector tiles of the job locations, rendered by PostGIS (``ST_AsMVT``).
+
+Below ``CLUSTER_MAX_ZOOM`` the jobs are clustered on a grid of ``CLUSTER_CELLS`` x ``CLUSTER_CELLS`` cells per tile,
+every feature then has the number of jobs in its cell as ``count`` (and the ``id`` if it is a single job). From there
+on every job is a feature of its own, with ``id``, ``title`` and ``company_name``.
+
+Tiles can be restricted to any queryset of jobs, e.g. the jobs in reach of an isochrone. Rendered tiles are cached in
+memory, the key contains a version of the job table (`jobs_version`) which changes whenever jobs are written, geocoded
+or deleted, so stale tiles are never served for longer than ``VERSION_CHECK_INTERVAL``.
+"""
+
+import time
+from collections.abc import Awaitable, Callable, Hashable
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection
+from django.db.models import Count, Max, Q, QuerySet
+
+from .cache import LRUCache
+from .models import JobOpening
+
+# width of the web mercator world in meters
+WORLD_METERS = 2 * 20037508.342789244
+
+_tile_cache = LRUCache(max_bytes=settings.VECTOR_TILES["MEMORY_MAX_BYTES"], name="tile")
+_jobs_version: tuple[tuple, float] | None = None
+
+
+async def jobs_version() -> tuple:
+    """
+    Changes whenever a job is written (``last_seen_at``), geocoded or archived (the number of active, located jobs) or
+    deleted, refreshed every ``VERSION_CHECK_INTERVAL`` seconds.
+    """
+    global _jobs_version
+
+    now = time.monotonic()
+    if _jobs_version is None or now - _jobs_version[1] > settings.VECTOR_TILES["VERSION_CHECK_INTERVAL"]:
+        version = await JobOpening.objects.aaggregate(
+            count=Count("id"),
+            located=Count("id", filter=Q(location__isnull=False, archived_at__isnull=True)),
+            last_seen_at=Max("last_seen_at"),
+        )
+        _jobs_version = (tuple(version.values()), now)
+    return _jobs_version[0]
+
+
+def is_valid_tile(z: int, x: int, y: int) -> bool:
+    return 0 <= z <= 22 and 0 <= x < 2**z and 0 <= y < 2**z
+
+
+CLUSTER_SQL = """
+    WITH bounds AS (SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom),
+    features AS (
+        SELECT
+            count(*) AS count,
+            CASE WHEN count(*) = 1 THEN min(j.id) END AS id,
+            ST_AsMVTGeom(ST_Centroid(ST_Collect(ST_Transform(j.location, 3857))), bounds.geom, %(extent)s, %(buffer)s)
+                AS geom
+        FROM core_jobopening j, bounds
+        WHERE j.location && ST_Transform(bounds.geom, 4326) AND j.archived_at IS NULL {jobs_filter}
+        GROUP BY ST_SnapToGrid(ST_Transform(j.location, 3857), %(cell)s), bounds.geom
+    )
+    SELECT ST_AsMVT(features, 'jobs', %(extent)s, 'geom') FROM features
+"""
+
+JOBS_SQL = """
+    WITH bounds AS (SELECT ST_TileEnvelope(%(z)s, %(x)s, %(y)s) AS geom),
+    features AS (
+        SELECT
+            j.id,
+            j.title,
+            j.company_name,
+            ST_AsMVTGeom(ST_Transform(j.location, 3857), bounds.geom, %(extent)s, %(buffer)s) AS geom
+        FROM core_jobopening j, bounds
+        WHERE j.location && ST_Transform(bounds.geom, 4326) AND j.archived_at IS NULL {jobs_filter}
+    )
+    SELECT ST_AsMVT(features, 'jobs', %(extent)s, 'geom') FROM features
+"""
+
+
+def _render_tile(z: int, x: int, y: int, jobs: QuerySet[JobOpening] | None) -> bytes:
+    tile_settings = settings.VECTOR_TILES
+    params = {
+        "z": z,
+        "x": x,
+        "y": y,
+        "extent": tile_settings["EXTENT"],
+        "buffer": tile_settings["BUFFER"],
+        "cell": WORLD_METERS / 2**z / tile_settings["CLUSTER_CELLS"],
+    }
+    jobs_filter = ""
+    if jobs is not None:
+        jobs_sql, jobs_params = jobs.values("id").query.sql_with_params()
+        # the subquery has positional placeholders, turn them into named ones like the rest of the tile query
+        params.update({f"jobs_{i}": value for i, value in enumerate(jobs_params)})
+        jobs_sql = jobs_sql.replace("%%", "%%%%") % tuple(f"%(jobs_{i})s" for i in range(len(jobs_params)))
+        jobs_filter = f"AND j.id IN ({jobs_sql})"
+
+    sql = CLUSTER_SQL if z < tile_settings["CLUSTER_MAX_ZOOM"] else JOBS_SQL
+    with connection.cursor() as cursor:
+        cursor.execute(sql.format(jobs_filter=jobs_filter), params)
+        return bytes(cursor.fetchone()[0])
+
+
+async def render_tile(
+    z: int,
+    x: int,
+    y: int,
+    get_jobs: Callable[[], Awaitable[QuerySet[JobOpening]]] | None = None,
+    filter_key: Hashable = None,
+) -> bytes:
+    """
+    Renders the tile with all geocoded jobs, or only with the ones returned by `get_jobs`. It is only called if the
+    tile isn't cached, `filter_key` identifies its jobs in the cache.
+    """
+    cache_key = (z, x, y, filter_key, await jobs_version())
+    tile = _tile_cache.get(cache_key)
+    if tile is None:
+        jobs = await get_jobs() if get_jobs is not None else None
+        tile = await sync_to_async(_render_tile)(z, x, y, jobs)
+        _tile_cache.set(cache_key, tile, size=len(tile) + 100)
+    return tile
@@ -0,0 +1,279 @@
+"""
+Request-level latency instrumentation.
+
+With ``REQUEST_TIMING["ENABLED"]``, `TimingMiddleware` collects the `Timings` of every request:
+
+- the stages timed with `timed`, e.g. ``isochrone`` and ``polygon`` in core/api.py and the upstream calls
+  (``graphhopper``, ``photon``, see core/upstream.py)
+- the view itself (``view``, see `TimedRouter`) and the validation and rendering of its result (``serialize``, see
+  `TimedNinjaAPI`)
+- the number and duration of the DB queries (``db``), through an execute wrapper on every connection
+- the lookups in the named caches (`LRUCache`, the persistent isochrone cache), as hits and misses
+
+The timings of a request are returned in its ``Server-Timing`` header (shown by the browser dev tools) and aggregated
+into histograms, which ``/metrics`` exposes in the Prometheus text format. The histograms are kept per process.
+
+The current `Timings` live in a context variable, which asgiref copies into the threads running the ORM queries of
+async views. When disabled, the middleware removes itself, no view or connection is wrapped and `timed` returns a
+shared no-op context manager after one context variable lookup.
+"""
+
+import contextvars
+import functools
+import threading
+import time
+from collections import defaultdict
+from contextlib import nullcontext
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db.backends.signals import connection_created
+from django.http import Http404, HttpRequest, HttpResponse
+from ninja import NinjaAPI, Router
+
+_current: contextvars.ContextVar["Timings | None"] = contextvars.ContextVar("timings", default=None)
+_untimed = nullcontext()
+
+
+class Timings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: dict[str, float] = defaultdict(float)
+        self.queries = 0
+        # cache name -> [hits, misses]
+        self.cache_lookups: dict[str, list[int]] = {}
+        self.view_finished: float | None = None
+
+    def add(self, stage: str, seconds: float):
+        self.stages[stage] += seconds
+
+    def server_timing(self, total: float) -> str:
+        metrics = []
+        for stage, seconds in self.stages.items():
+            metric = f"{stage};dur={seconds * 1000:.1f}"
+            if stage == "db":
+                metric += f';desc="{self.queries} queries"'
+            metrics.append(metric)
+        for cache, (hits, misses) in self.cache_lookups.items():
+            metrics.append(f'cache-{cache};desc="{hits} hits, {misses} misses"')
+        metrics.append(f"total;dur={total * 1000:.1f}")
+        return ", ".join(metrics)
+
+
+class _Stage:
+    __slots__ = ("timings", "stage", "started")
+
+    def __init__(self, timings: Timings, stage: str):
+        self.timings = timings
+        self.stage = stage
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+
+    def __exit__(self, *exc_info):
+        self.timings.add(self.stage, time.perf_counter() - self.started)
+
+
+def timed(stage: str):
+    """Context manager that adds the time spent in it to the stage of the current request."""
+    timings = _current.get()
+    if timings is None:
+        return _untimed
+    return _Stage(timings, stage)
+
+
+def record_cache_lookup(cache: str, hit: bool):
+    timings = _current.get()
+    if timings is not None:
+        lookups = timings.cache_lookups.setdefault(cache, [0, 0])
+        lookups[0 if hit else 1] += 1
+
+
+def _time_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        timings.add("db", time.perf_counter() - started)
+        timings.queries += 1
+
+
+def _install_query_timer(sender, connection, **kwargs):
+    # the signal is sent again whenever the connection reconnects
+    if _time_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_time_query)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", r"\\").replace('"', r"\"").replace("\n", r"\n")
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...], buckets: tuple[float, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> cumulative bucket counts, sum, count
+        self._series: dict[tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *label_values):
+        with self._lock:
+            series = self._series.get(label_values)
+            if series is None:
+                series = self._series[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            series = sorted((label_values, list(values)) for label_values, values in self._series.items())
+        for label_values, values in series:
+            labels = "".join(f'{name}="{_escape(value)}",' for name, value in zip(self.labels, label_values))
+            for bound, count in zip(self.buckets, values):
+                lines.append(f'{self.name}_bucket{{{labels}le="{bound}"}} {count}')
+            lines.append(f'{self.name}_bucket{{{labels}le="+Inf"}} {values[-1]}')
+            lines.append(f"{self.name}_sum{{{labels.rstrip(',')}}} {values[-2]}")
+            lines.append(f"{self.name}_count{{{labels.rstrip(',')}}} {values[-1]}")
+        return lines
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labels: tuple[str, ...]):
+        self.name = name
+        self.documentation = documentation
+        self.labels = labels
+        self._values: dict[tuple, int] = defaultdict(int)
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int, *label_values):
+        with self._lock:
+            self._values[label_values] += amount
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            values = sorted(self._values.items())
+        for label_values, value in values:
+            labels = ",".join(f'{name}="{_escape(value)}"' for name, value in zip(self.labels, label_values))
+            lines.append(f"{self.name}{{{labels}}} {value}")
+        return lines
+
+
+SECONDS_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+request_duration = Histogram(
+    "http_request_duration_seconds", "Duration of the requests.", ("endpoint", "method", "status"), SECONDS_BUCKETS
+)
+stage_duration = Histogram(
+    "http_request_stage_duration_seconds",
+    "Time spent per request in a stage of it.",
+    ("endpoint", "stage"),
+    SECONDS_BUCKETS,
+)
+db_queries = Histogram(
+    "http_request_db_queries", "DB queries per request.", ("endpoint",), (0, 1, 2, 5, 10, 20, 50, 100)
+)
+cache_lookups = Counter("cache_lookups_total", "Cache lookups during requests.", ("cache", "result"))
+
+METRICS = (request_duration, stage_duration, db_queries, cache_lookups)
+
+
+def observe(endpoint: str, method: str, status: int, total: float, timings: Timings):
+    request_duration.observe(total, endpoint, method, status)
+    for stage, seconds in timings.stages.items():
+        stage_duration.observe(seconds, endpoint, stage)
+    db_queries.observe(timings.queries, endpoint)
+    for cache, (hits, misses) in timings.cache_lookups.items():
+        cache_lookups.inc(hits, cache, "hit")
+        cache_lookups.inc(misses, cache, "miss")
+
+
+class TimingMiddleware:
+    async_capable = True
+    sync_capable = False
+
+    def __init__(self, get_response):
+        if not settings.REQUEST_TIMING["ENABLED"]:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        markcoroutinefunction(self)
+        connection_created.connect(_install_query_timer, dispatch_uid="core.timing")
+
+    async def __call__(self, request: HttpRequest) -> HttpResponse:
+        timings = Timings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        total = time.perf_counter() - timings.started
+
+        # the route pattern, so the number of label values stays bounded
+        endpoint = request.resolver_match.route if request.resolver_match else "unmatched"
+        observe(endpoint, request.method, response.status_code, total, timings)
+        response["Server-Timing"] = timings.server_timing(total)
+        return response
+
+
+def _timed_view(view_func):
+    def finish():
+        if (timings := _current.get()) is not None:
+            timings.view_finished = time.perf_counter()
+
+    if iscoroutinefunction(view_func):
+
+        @functools.wraps(view_func)
+        async def view(*args, **kwargs):
+            with timed("view"):
+                result = await view_func(*args, **kwargs)
+            finish()
+            return result
+
+    else:
+
+        @functools.wraps(view_func)
+        def view(*args, **kwargs):
+            with timed("view"):
+                result = view_func(*args, **kwargs)
+            finish()
+            return result
+
+    return view
+
+
+class TimedRouter(Router):
+    """Times the views of its operations as stage ``view``."""
+
+    def add_api_operation(self, path: str, methods: list[str], view_func, **kwargs):
+        if settings.REQUEST_TIMING["ENABLED"]:
+            view_func = _timed_view(view_func)
+        super().add_api_operation(path, methods, view_func, **kwargs)
+
+
+class TimedNinjaAPI(NinjaAPI):
+    """Times the validation and rendering of the view results as stage ``serialize``."""
+
+    def create_response(self, request: HttpRequest, data, **kwargs) -> HttpResponse:
+        response = super().create_response(request, data, **kwargs)
+        timings = _current.get()
+        if timings is not None and timings.view_finished is not None:
+            timings.add("serialize", time.perf_counter() - timings.view_finished)
+        return response
+
+
+def metrics(request: HttpRequest) -> HttpResponse:
+    """The request metrics of this process in the Prometheus text format."""
+    if not settings.REQUEST_TIMING["ENABLED"]:
+        raise Http404("Request timing is disabled")
+    lines = [line for metric in METRICS for line in metric.render()]
+    return HttpResponse("\n".join(lines) + "\n", content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,136 @@
+"""
+Precomputed travel times from popular origins (hubs) to every job.
+
+Most users start from a few dozen towns. For every hub and profile in ``TRAVEL_TIME_PROFILES`` the travel time to
+every geocoded job is stored in `HubTravelTime`, so /jobs requests from within a hub's radius are answered by an
+indexed ``travel_seconds <= X`` filter, without an isochrone from GraphHopper.
+
+The table is filled incrementally: only jobs without a travel time for the hub and profile are routed, which after the
+initial run are the jobs that were geocoded since the last run. Jobs are also routed from the hubs as soon as they get a
+location (`route_from_hubs`, called by the ingest and the geocode workers), so between two runs a hub doesn't leave out
+new jobs, and a job whose location changed is routed again.
+
+Routes from arbitrary origins (`travel_routes`) are cached in memory per snapped origin, profile and job.
+"""
+
+import math
+
+from django.conf import settings
+from django.db.models import Exists, OuterRef, QuerySet
+
+from .cache import LRUCache
+from .isochrones import get_graph_version, snap_to_grid
+from .models import Hub, HubTravelTime, JobOpening
+from .routing import Route, one_to_many
+
+EARTH_RADIUS_METERS = 6_371_000
+
+# rough size of a cached route (key and value), the route cache is bounded by bytes like the isochrone cache
+ROUTE_CACHE_ENTRY_BYTES = 200
+
+_route_cache = LRUCache(
+    max_bytes=settings.ROUTE_CACHE["MEMORY_MAX_BYTES"], ttl=settings.ROUTE_CACHE["TTL"], name="route"
+)
+_missing = object()
+
+
+def distance_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance (haversine)."""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_METERS * math.asin(math.sqrt(a))
+
+
+async def find_hub(*, lat: float, lon: float, profile: str) -> Hub | None:
+    """Returns the nearest hub whose radius contains the origin and whose travel times for `profile` are complete."""
+    nearest, nearest_distance = None, math.inf
+    async for hub in Hub.objects.all():
+        if profile not in hub.ready_profiles:
+            continue
+        distance = distance_meters(lat, lon, hub.location.y, hub.location.x)
+        if distance <= hub.radius_meters and distance < nearest_distance:
+            nearest, nearest_distance = hub, distance
+    return nearest
+
+
+def jobs_reachable_from_hub(hub: Hub, profile: str, travel_seconds: int) -> QuerySet[JobOpening]:
+    reachable = HubTravelTime.objects.filter(hub=hub, profile=profile, travel_seconds__lte=travel_seconds)
+    return JobOpening.objects.active().filter(id__in=reachable.values("job_id"))
+
+
+async def route_jobs(hub: Hub, profile: str, jobs: list[JobOpening]):
+    """Stores the travel times from the hub to the given geocoded jobs, replacing those stored before."""
+    routes = await one_to_many(hub.location.coords, {job.id: job.location.coords for job in jobs}, profile)
+    await HubTravelTime.objects.abulk_create(
+        [
+            HubTravelTime(
+                hub=hub,
+                profile=profile,
+                job_id=job_id,
+                travel_seconds=round(r.time_seconds) if r else None,
+                distance_meters=round(r.distance_meters) if r else None,
+            )
+            for job_id, r in routes.items()
+        ],
+        update_conflicts=True,
+        unique_fields=["hub", "profile", "job"],
+        update_fields=["travel_seconds", "distance_meters", "computed_at"],
+    )
+
+
+async def route_from_hubs(jobs: list[JobOpening]):
+    """
+    Routes the jobs that have a location from every hub, for the profiles the hub answers. Called when jobs got a
+    (new) location, so the hubs stay complete until the next `precompute`.
+    """
+    if not (located := [job for job in jobs if job.location is not None]):
+        return
+    async for hub in Hub.objects.all():
+        for profile in hub.ready_profiles:
+            await route_jobs(hub, profile, located)
+
+
+async def precompute(hub: Hub, profile: str, batch_size: int = 200) -> int:
+    """Computes the missing travel times from the hub to all geocoded jobs, returns the number of jobs routed."""
+    known = HubTravelTime.objects.filter(hub=hub, profile=profile, job=OuterRef("pk"))
+    missing = JobOpening.objects.active().filter(~Exists(known), location__isnull=False).only("id", "location")
+
+    routed = 0
+    # jobs without a route are stored too (with an empty travel time), so every batch shrinks the missing set
+    while batch := [job async for job in missing[:batch_size]]:
+        await route_jobs(hub, profile, batch)
+        routed += len(batch)
+        print(f"{hub} ({profile}): {routed} jobs routed")
+
+    if profile not in hub.ready_profiles:
+        hub.ready_profiles = [*hub.ready_profiles, profile]
+        await hub.asave(update_fields=["ready_profiles"])
+    return routed
+
+
+async def travel_routes(*, lat: float, lon: float, profile: str, job_ids: list[int]) -> dict[int, Route | None]:
+    """
+    Returns the routes from the origin to the given jobs, with one query for all job locations and concurrent
+    requests to GraphHopper for the routes that aren't cached. Jobs that don't exist or aren't geocoded are missing.
+    """
+    lat, lon = snap_to_grid(lat, lon, settings.ROUTE_CACHE["GRID_METERS"])
+    graph_version = await get_graph_version()
+
+    def cache_key(job_id: int):
+        return lat, lon, profile, job_id, graph_version
+
+    results = {}
+    for job_id in job_ids:
+        cached = _route_cache.get(cache_key(job_id), _missing)
+        if cached is not _missing:
+            results[job_id] = cached
+
+    if missing := [job_id for job_id in job_ids if job_id not in results]:
+        jobs = JobOpening.objects.filter(id__in=missing, location__isnull=False).only("id", "location")
+        locations = {job.id: job.location.coords async for job in jobs}
+        for job_id, route in (await one_to_many((lon, lat), locations, profile)).items():
+            _route_cache.set(cache_key(job_id), route, size=ROUTE_CACHE_ENTRY_BYTES)
+            results[job_id] = route
+    return results
@@ -0,0 +1,94 @@
+"""
+Shared HTTP clients for the self-hosted geo services (GraphHopper, Photon).
+
+Every service gets one pooled ``httpx.AsyncClient`` per event loop, so requests reuse keep-alive connections instead of
+paying the TCP setup on every call. A semaphore per service (and loop) caps the number of in-flight requests, which
+keeps a burst of API traffic from queueing up inside the JVMs. Clients and semaphores are bound to the loop they were
+created on, so threads with their own loop (e.g. the geocoding workers) get their own pair, which they close themselves
+with `close_clients`. The time requests spend waiting for and talking to a service is timed as a stage named after it
+(see core/timing.py).
+
+The clients are opened and closed by the ASGI lifespan (see ``backend/asgi.py``). Servers that don't speak the
+lifespan protocol (e.g. daphne) still work, the clients are then opened lazily on first use.
+"""
+
+import asyncio
+import weakref
+
+import httpx
+from django.conf import settings
+
+from .timing import timed
+
+
+class UpstreamService:
+    def __init__(self, name: str):
+        self.name = name
+        # loop -> client and semaphore, entries of loops that were garbage collected disappear
+        self._clients: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop, tuple[httpx.AsyncClient, asyncio.Semaphore]
+        ] = weakref.WeakKeyDictionary()
+
+    @property
+    def config(self) -> dict:
+        return settings.UPSTREAM_SERVICES[self.name]
+
+    @property
+    def base_url(self) -> str:
+        return self.config["BASE_URL"]
+
+    def _open(self) -> tuple[httpx.AsyncClient, asyncio.Semaphore]:
+        loop = asyncio.get_running_loop()
+        opened = self._clients.get(loop)
+        if opened is None:
+            config = self.config
+            client = httpx.AsyncClient(
+                base_url=config["BASE_URL"],
+                limits=httpx.Limits(
+                    max_connections=config["MAX_CONNECTIONS"],
+                    max_keepalive_connections=config["MAX_CONNECTIONS"],
+                    keepalive_expiry=config["KEEPALIVE_EXPIRY"],
+                ),
+                timeout=httpx.Timeout(
+                    config["TIMEOUT"],
+                    connect=config["CONNECT_TIMEOUT"],
+                    pool=config["POOL_TIMEOUT"],
+                ),
+            )
+            opened = self._clients[loop] = (client, asyncio.Semaphore(config["MAX_CONCURRENCY"]))
+        return opened
+
+    async def request(self, method: str, url: str, **kwargs) -> httpx.Response:
+        client, semaphore = self._open()
+        with timed(self.name):
+            async with semaphore:
+                resp = await client.request(method, url, **kwargs)
+        return resp.raise_for_status()
+
+    async def get(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def aclose(self):
+        """Closes the client of the running loop, the clients of other loops are left to their owners."""
+        opened = self._clients.pop(asyncio.get_running_loop(), None)
+        if opened is not None:
+            await opened[0].aclose()
+
+
+graphhopper = UpstreamService("graphhopper")
+photon = UpstreamService("photon")
+
+SERVICES = (graphhopper, photon)
+
+
+async def open_clients():
+    for service in SERVICES:
+        service._open()
+
+
+async def close_clients():
+    for service in SERVICES:
+        await service.aclose()